@@ -0,0 +1,199 @@
+"""
+Two-tier cache of LLM answers
+Answers are keyed on the normalized question, a hash of the retrieved
+context and the model/prompt version. Lookups go to an in-process LRU first
+and a shared Django cache second; an answer past its TTL is still served
+for a while as stale, while a background thread asks the LLM again
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+WORD = re.compile(r"[^\W_]+")
+
+
+def normalize_query(query):
+    """Lower-cased words of a question, so case, spacing and punctuation do not split cache entries"""
+    return " ".join(WORD.findall(query.lower()))
+
+
+def answer_key(query, context, model_version):
+    context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()
+    raw = f"{model_version}\n{normalize_query(query)}\n{context_hash}"
+    return "chatbot-answer:" + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AnswerCache:
+    """In-process LRU in front of an optional shared cache, with stale-while-revalidate
+
+    An entry is fresh for ttl seconds and then served as stale for another
+    stale_ttl seconds, during which one background refresh per key replaces
+    it. shared is a Django cache (e.g. caches['chatbot_answers']) or None.
+    """
+
+    def __init__(self, max_entries=1024, ttl=86400, stale_ttl=604800, shared=None, executor=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.shared = shared
+        self.executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix="answer-refresh")
+        self._entries = OrderedDict()  # key -> (answer, fresh_until, stale_until)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._counts = {
+            "local_hits": 0, "shared_hits": 0, "stale_hits": 0, "misses": 0,
+            "refreshes": 0, "refresh_errors": 0,
+        }
+
+    def get(self, key, refresh):
+        """(answer, status) for key, or (None, 'miss')
+
+        status is 'local', 'shared' or 'stale'; a stale answer is replaced
+        in the background by refresh(), which returns (answer, cacheable)
+        like the compute function of get_or_compute.
+        """
+        now = time.time()
+        entry, tier = self._get_local(key, now), 'local'
+        if entry is None:
+            entry, tier = self._get_shared(key, now), 'shared'
+
+        if entry is None:
+            self._count("misses")
+            return None, 'miss'
+        answer, fresh_until, _ = entry
+        if now < fresh_until:
+            self._count(tier + "_hits")
+            return answer, tier
+        self._count("stale_hits")
+        self._refresh(key, refresh)
+        return answer, 'stale'
+
+    def get_or_compute(self, key, compute):
+        """Cached answer for key, calling compute() on a miss; returns (answer, status)
+
+        compute() returns (answer, cacheable); an answer that is not
+        cacheable (e.g. cut off at max_tokens) is returned with status
+        'uncached' and not stored. Otherwise status is 'local', 'shared',
+        'stale' or 'miss'. Exceptions from compute() propagate and nothing
+        is stored.
+        """
+        answer, status = self.get(key, compute)
+        if status != 'miss':
+            return answer, status
+        answer, cacheable = compute()
+        if not cacheable:
+            return answer, 'uncached'
+        self.set(key, answer)
+        return answer, 'miss'
+
+    def set(self, key, answer):
+        now = time.time()
+        entry = (answer, now + self.ttl, now + self.ttl + self.stale_ttl)
+        self._set_local(key, entry)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, entry, timeout=self.ttl + self.stale_ttl)
+            except Exception as e:
+                print(f"Could not store answer in shared cache: {e}")
+
+    def _get_local(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now >= entry[2]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _set_local(self, key, entry):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_shared(self, key, now):
+        if self.shared is None:
+            return None
+        try:
+            entry = self.shared.get(key)
+        except Exception as e:
+            print(f"Could not read answer from shared cache: {e}")
+            return None
+        if entry is None or now >= entry[2]:
+            return None
+        self._set_local(key, entry)
+        return entry
+
+    def _refresh(self, key, compute):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                answer, cacheable = compute()
+                # An incomplete answer does not replace the stale one
+                if cacheable:
+                    self.set(key, answer)
+                self._count("refreshes")
+            except Exception as e:
+                # Keep serving the stale answer until it expires
+                print(f"Background answer refresh failed: {e}")
+                self._count("refresh_errors")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self.executor.submit(run)
+
+    def _count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def stats(self):
+        """Lookup counts per outcome and the overall hit rate"""
+        with self._lock:
+            counts = dict(self._counts)
+            entries = len(self._entries)
+        hits = counts["local_hits"] + counts["shared_hits"] + counts["stale_hits"]
+        lookups = hits + counts["misses"]
+        return {
+            **counts,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "local_entries": entries,
+            "shared": self.shared is not None,
+        }
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """The process-wide AnswerCache, or None when CHATBOT_ANSWER_CACHE_TTL is 0"""
+    global _answer_cache
+    if _answer_cache is None and settings.CHATBOT_ANSWER_CACHE_TTL > 0:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                shared = None
+                if settings.CHATBOT_ANSWER_CACHE_ALIAS:
+                    from django.core.cache import caches
+                    shared = caches[settings.CHATBOT_ANSWER_CACHE_ALIAS]
+                _answer_cache = AnswerCache(
+                    settings.CHATBOT_ANSWER_CACHE_SIZE,
+                    settings.CHATBOT_ANSWER_CACHE_TTL,
+                    settings.CHATBOT_ANSWER_CACHE_STALE_TTL,
+                    shared,
+                )
+    return _answer_cache
@@ -1,7 +1,7 @@
 import os
-import openai
 from dotenv import load_dotenv
 from .ontology_service import OntologyService
+from .llm_client import get_deepseek_client
 
 # Load environment variables
 try:
@@ -15,15 +15,8 @@ class ChatbotService:
     def __init__(self):
         self.ontology_service = OntologyService()
         
-        # Initialize DeepSeek client
-        try:
-            self.client = openai.OpenAI(
-                api_key=os.getenv("DEEPSEEK_API_KEY"),
-                base_url="https://api.deepseek.com"
-            )
-        except Exception as e:
-            print(f"Failed to initialize DeepSeek client: {e}")
-            self.client = None
+        # Shared DeepSeek client
+        self.client = get_deepseek_client()
 
     def get_response(self, user_query):
         """Get chatbot response for user query"""
@@ -0,0 +1,162 @@
+"""
+Token-budgeted LLM context assembly
+Picks the species record fields relevant to the query intent, drops repeated
+species and repeated text, and stops at a token budget; the context of a
+(species set, intent, knowledge base version) is built once and memoized
+"""
+from functools import lru_cache
+
+# Label of every record field that can appear in a context, in the order the
+# full species context lists them
+FIELD_LABELS = {
+    "common": "Common Name",
+    "family": "Family",
+    "order": "Order",
+    "iucn_status": "IUCN Status",
+    "max_length": "Maximum Length",
+    "habitat": "Habitat",
+    "description": "Description",
+    "morphology": "Morphology",
+    "ecology": "Ecology & Behavior",
+    "diet": "Diet",
+    "reproduction": "Reproduction",
+    "distribution": "Distribution",
+    "specific_location": "Specific Locations",
+    "status_notes": "Conservation Notes",
+    "colour_variants": "Color Variants",
+    "temperature_range": "Temperature Range",
+    "ph_range": "pH Range",
+    "dh_range": "dH Range",
+    "aquarium_group_size": "Aquarium Group Size",
+    "aquarium_tank_size": "Aquarium Tank Size",
+    "fisheries_value": "Fisheries Value",
+}
+
+# Fields sent for each intent, most relevant first; 'general' keeps the
+# fields the context always listed
+INTENT_FIELDS = {
+    "habitat": ("habitat", "ecology", "distribution", "specific_location", "temperature_range", "ph_range"),
+    "conservation": ("iucn_status", "status_notes", "distribution", "fisheries_value"),
+    "appearance": ("description", "morphology", "colour_variants", "max_length"),
+    "behavior": ("ecology", "diet", "reproduction", "habitat"),
+    "distribution": ("distribution", "specific_location", "habitat"),
+    "aquarium": ("aquarium_group_size", "aquarium_tank_size", "temperature_range", "ph_range",
+                 "dh_range", "diet", "reproduction"),
+    "general": ("common", "family", "order", "iucn_status", "max_length", "habitat", "description",
+                "morphology", "ecology", "diet", "distribution", "specific_location", "status_notes",
+                "colour_variants", "temperature_range", "ph_range", "aquarium_group_size",
+                "aquarium_tank_size"),
+}
+
+# Upper bound on the answer length for each intent, in tokens
+INTENT_MAX_TOKENS = {
+    "habitat": 300,
+    "conservation": 250,
+    "appearance": 350,
+    "behavior": 300,
+    "distribution": 250,
+    "aquarium": 300,
+    "general": 500,
+}
+
+# Lines are truncated rather than dropped when at least this many tokens remain
+MIN_TRUNCATED_TOKENS = 24
+
+
+def approx_tokens(text):
+    """Approximate token count (about four characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text, tokens):
+    """Cut text at a word boundary to roughly the given number of tokens"""
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text.rfind(' ', 0, limit - 3)
+    return text[:cut if cut > 0 else limit - 3].rstrip(' ,;:') + "..."
+
+
+def response_max_tokens(intent, species_count, cap):
+    """max_tokens for an answer: the intent's allowance, plus a third for each extra species, up to cap"""
+    base = INTENT_MAX_TOKENS.get(intent, INTENT_MAX_TOKENS["general"])
+    return min(cap, base + base * max(species_count - 1, 0) // 3)
+
+
+class ContextBuilder:
+    """Builds LLM context strings for a knowledge base within a token budget"""
+
+    def __init__(self, knowledge_base, token_budget=1200, cache_size=1024):
+        self.knowledge_base = knowledge_base
+        self.token_budget = token_budget
+        self._species_context = lru_cache(maxsize=cache_size)(self._build_species_context)
+
+    def species_context(self, species_keys, intent):
+        """Context for the given species (duplicates ignored) and query intent"""
+        species_keys = tuple(dict.fromkeys(species_keys))
+        return self._species_context(species_keys, intent, self.knowledge_base.version)
+
+    def _build_species_context(self, species_keys, intent, version):
+        # version only keys the cache, so a reloaded ontology never serves old contexts
+        mapping = self.knowledge_base.fish_species_mapping
+        fields = INTENT_FIELDS.get(intent, INTENT_FIELDS["general"])
+        blocks = []
+        remaining = self.token_budget
+        for key in species_keys:
+            fish_info = mapping[key]
+            header = f"Fish Species: {fish_info['vernacular']} ({fish_info['scientific']})"
+            remaining -= approx_tokens(header)
+            blocks.append([header])
+            if intent != "general":
+                # Names help the model match the species however the user called it
+                blocks[-1].append(f"Common Name: {fish_info['common']}")
+                remaining -= approx_tokens(blocks[-1][-1])
+
+        # Fill fields round-robin, so every species gets its most relevant fields first
+        seen = [set() for _ in species_keys]
+        for field in fields:
+            for block, seen_texts, key in zip(blocks, seen, species_keys):
+                text = mapping[key].get(field)
+                if not text or text in seen_texts or remaining <= 0:
+                    continue
+                seen_texts.add(text)
+                line = f"{FIELD_LABELS[field]}: {text}"
+                cost = approx_tokens(line)
+                if cost > remaining:
+                    if remaining < MIN_TRUNCATED_TOKENS:
+                        continue
+                    line = truncate_to_tokens(line, remaining)
+                    cost = approx_tokens(line)
+                block.append(line)
+                remaining -= cost
+        return "\n\n".join("\n".join(block) for block in blocks)
+
+    def passage_context(self, passages, top_species=()):
+        """Context from retrieved (fish_key, fish_info, field, text) passages, best first, within the budget
+
+        top_species, (fish_key, fish_info) pairs best first, are named before
+        the passages so the model knows which species the question points to.
+        """
+        lines = ["No specific fish species mentioned."]
+        if top_species:
+            lines.append("Species best matching the query: " + ", ".join(
+                f"{fish_info['vernacular']} ({fish_info['scientific']})" for fish_key, fish_info in top_species
+            ))
+        lines.append("Passages matching the query:")
+        remaining = self.token_budget - sum(approx_tokens(line) for line in lines)
+        seen = set()
+        for fish_key, fish_info, field, text in passages:
+            if (fish_key, text) in seen:
+                continue
+            seen.add((fish_key, text))
+            label = field.replace('_', ' ').capitalize()
+            line = f"{fish_info['vernacular']} ({fish_info['scientific']}) - {label}: {text}"
+            cost = approx_tokens(line)
+            if cost > remaining:
+                if remaining < MIN_TRUNCATED_TOKENS:
+                    break
+                line = truncate_to_tokens(line, remaining)
+                cost = approx_tokens(line)
+            lines.append(line)
+            remaining -= cost
+        return "\n".join(lines)
@@ -0,0 +1,329 @@
+"""
+Dense-vector retrieval over ontology passages
+Passages are embedded offline with hashed word and character n-gram TF-IDF
+features followed by a sparse random projection. Character n-grams match
+inflections and misspellings ("stripes" / "striped"); paraphrases with no
+shared characters ("stripy" / "banded") only match through the curated
+synonym list in CONCEPTS, not through the embedding itself. Vectors
+are stored as a memory-mapped NumPy matrix with one directory per ontology
+version; a new version reuses the rows of every passage whose text is
+unchanged and only embeds the rest
+"""
+import hashlib
+import json
+import os
+import shutil
+import zlib
+from contextlib import contextmanager
+import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not serialised between processes
+    fcntl = None
+from fishapi.ranking import top_k
+from .keyword_index import STOPWORDS, terms
+
+EMBEDDINGS_FILE = 'embeddings.npy'
+DOCUMENT_FREQUENCIES_FILE = 'document_frequencies.npy'
+METADATA_FILE = 'passages.json'
+LOCK_FILE = '.lock'
+
+# Bump when features or weighting change, so existing vectors are not reused
+EMBEDDER_VERSION = 1
+
+# Curated synonym list: each word adds a shared concept feature, so a query
+# word matches passages using any word of the same group. This is the only
+# source of synonym matching; it was written for this ontology's colour,
+# pattern, size, habitat and diet vocabulary, and any paraphrase outside these
+# groups (e.g. "vermilion", "creek-dwelling", "omnivorous") gets no help.
+# Extend it when questions use words the ontology does not
+CONCEPTS = {
+    "band": ("band", "bands", "banded", "bar", "bars", "barred", "stripe", "stripes",
+             "striped", "stripy", "stripey", "streak", "streaks", "line", "lines"),
+    "spot": ("spot", "spots", "spotted", "spotty", "blotch", "blotches", "blotched", "dot", "dots"),
+    "red": ("red", "reddish", "ruby", "crimson", "scarlet"),
+    "small": ("small", "tiny", "little", "dwarf"),
+    "large": ("large", "big", "huge", "largest", "biggest"),
+    "stream": ("stream", "streams", "rivulet", "rivulets", "creek", "creeks", "brook", "brooks"),
+    "river": ("river", "rivers", "basin", "basins", "tributary", "tributaries"),
+    "food": ("diet", "eat", "eats", "eating", "food", "feed", "feeds", "feeding"),
+}
+CONCEPT_OF = {word: concept for concept, words in CONCEPTS.items() for word in words}
+# Concept features weigh more than the word itself, as they bridge paraphrases
+CONCEPT_WEIGHT = 2.0
+
+
+def passage_text(field, text):
+    """Text embedded for a passage, prefixed with its field label (e.g. diet, habitat)"""
+    return f"{field.replace('_', ' ')}: {text}"
+
+
+def passage_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _mix(x):
+    # murmur3 finalizer over uint32 arrays
+    x = x ^ (x >> np.uint32(16))
+    x = x * np.uint32(0x85EBCA6B)
+    x = x ^ (x >> np.uint32(13))
+    x = x * np.uint32(0xC2B2AE35)
+    return x ^ (x >> np.uint32(16))
+
+
+class HashedNgramEmbedder:
+    """Hashed n-gram TF-IDF features projected to a fixed number of dimensions
+
+    The projection matrix is never materialised: the row of a feature bucket
+    is derived from a hash of (seed, bucket, dimension), giving the sparse
+    {-1, 0, +1} projection of Achlioptas without storing buckets x dimensions.
+    """
+
+    def __init__(self, dimensions=256, buckets=1 << 18, ngram_range=(3, 5), seed=0, stopwords=STOPWORDS):
+        self.dimensions = dimensions
+        self.buckets = buckets
+        self.ngram_range = ngram_range
+        self.seed = seed
+        self.stopwords = stopwords
+        self._dimension_ids = np.arange(dimensions, dtype=np.uint32)
+
+    def config(self):
+        return {
+            "embedder_version": EMBEDDER_VERSION,
+            "dimensions": self.dimensions,
+            "buckets": self.buckets,
+            "ngram_range": list(self.ngram_range),
+            "seed": self.seed,
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["dimensions"], config["buckets"], tuple(config["ngram_range"]), config["seed"])
+
+    def features(self, text):
+        """(bucket ids, weights) of the words, concepts and character n-grams of a text
+
+        Each word weighs 1, its concept (if any) CONCEPT_WEIGHT, and its
+        character n-grams share a total weight of 1, so long words do not
+        drown out short ones.
+        """
+        features = []
+        weights = []
+        low, high = self.ngram_range
+        for word in terms(text, self.stopwords):
+            features.append("w:" + word)
+            weights.append(1.0)
+            if word in CONCEPT_OF:
+                features.append("c:" + CONCEPT_OF[word])
+                weights.append(CONCEPT_WEIGHT)
+            padded = f"<{word}>"
+            ngrams = [padded[i:i + n] for n in range(low, high + 1) for i in range(len(padded) - n + 1)]
+            features.extend(ngrams)
+            weights.extend([1.0 / len(ngrams)] * len(ngrams))
+        ids = np.fromiter(
+            (zlib.crc32(feature.encode('utf-8')) % self.buckets for feature in features),
+            dtype=np.int64, count=len(features)
+        )
+        ids, positions = np.unique(ids, return_inverse=True)
+        return ids, np.bincount(positions, weights=weights, minlength=len(ids)).astype(np.float32)
+
+    def document_frequencies(self, texts):
+        frequencies = np.zeros(self.buckets, dtype=np.int32)
+        for text in texts:
+            ids, _ = self.features(text)
+            frequencies[ids] += 1
+        return frequencies
+
+    @staticmethod
+    def idf(document_frequencies, document_count):
+        return (np.log((1 + document_count) / (1 + document_frequencies.astype(np.float32))) + 1).astype(np.float32)
+
+    def _projection(self, ids):
+        hashed = _mix(
+            (ids.astype(np.uint32)[:, None] * np.uint32(self.dimensions) + self._dimension_ids)
+            ^ np.uint32(self.seed * 0x9E3779B1 & 0xFFFFFFFF)
+        ) % np.uint32(6)
+        # +1 with probability 1/6, -1 with probability 1/6, 0 otherwise
+        return (hashed == 0).astype(np.float32) - (hashed == 1).astype(np.float32)
+
+    def embed(self, text, idf):
+        """Unit-length vector of a text (all zeros when it has no features)"""
+        ids, weights = self.features(text)
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        if len(ids):
+            weights = np.log1p(weights) * idf[ids]
+            vector = weights @ self._projection(ids)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector /= norm
+        return vector
+
+
+def version_dir(index_dir, version):
+    return os.path.join(index_dir, version[:16])
+
+
+def _read_metadata(path):
+    with open(os.path.join(path, METADATA_FILE)) as f:
+        return json.load(f)
+
+
+def _latest_build(index_dir):
+    """Directory of the most recently written index version, or None"""
+    if not os.path.isdir(index_dir):
+        return None
+    builds = [
+        os.path.join(index_dir, name) for name in os.listdir(index_dir)
+        if not name.startswith('.') and os.path.exists(os.path.join(index_dir, name, METADATA_FILE))
+    ]
+    return max(builds, key=os.path.getmtime) if builds else None
+
+
+@contextmanager
+def index_lock(index_dir):
+    """Exclusive lock on index_dir shared by every process that builds or opens an index there"""
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, LOCK_FILE), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def build_dense_index(index_dir, passages, version, embedder=None, full=False):
+    """Write the index of (species key, field, text) passages for an ontology version
+
+    Unless full is set, the vectors and document frequencies of the latest
+    existing version are reused: only passages whose text is new are
+    embedded, with the document frequencies that version was fitted on.
+    Returns (reused, embedded) passage counts; a text repeated in several
+    passages is only embedded once.
+    """
+    with index_lock(index_dir):
+        return _build_dense_index(index_dir, passages, version, embedder, full)
+
+
+def open_dense_index(index_dir, passages, version):
+    """Open the index of an ontology version, building it first if it is missing
+
+    Returns (DenseIndex, (reused, embedded) or None when nothing was built).
+    Building and opening happen under index_lock, so workers starting
+    together never open a directory another one is replacing or removing;
+    once open, the memory maps stay valid even if the files are deleted.
+    """
+    with index_lock(index_dir):
+        built = None
+        if not DenseIndex.exists(index_dir, version):
+            built = _build_dense_index(index_dir, passages, version)
+        return DenseIndex(index_dir, version, passages), built
+
+
+def _build_dense_index(index_dir, passages, version, embedder=None, full=False):
+    embedder = embedder or HashedNgramEmbedder()
+    target = version_dir(index_dir, version)
+    texts = [passage_text(field, text) for _, field, text in passages]
+    digests = [passage_digest(text) for text in texts]
+
+    previous = None if full else _latest_build(index_dir)
+    previous_rows = {}
+    if previous is not None:
+        metadata = _read_metadata(previous)
+        if metadata["embedder"] == embedder.config():
+            previous_rows = {digest: row for row, (_, _, digest) in enumerate(metadata["passages"])}
+        else:
+            previous = None
+
+    if previous is not None:
+        document_frequencies = np.load(os.path.join(previous, DOCUMENT_FREQUENCIES_FILE))
+        document_count = metadata["document_count"]
+        previous_embeddings = np.load(os.path.join(previous, EMBEDDINGS_FILE), mmap_mode='r')
+    else:
+        document_frequencies = embedder.document_frequencies(texts)
+        document_count = len(texts)
+    idf = embedder.idf(document_frequencies, document_count)
+
+    embeddings = np.empty((len(texts), embedder.dimensions), dtype=np.float32)
+    reused = 0
+    embedded_rows = {}  # digest -> row embedded by this build, for texts repeated across species
+    for row, (text, digest) in enumerate(zip(texts, digests)):
+        if digest in previous_rows:
+            embeddings[row] = previous_embeddings[previous_rows[digest]]
+            reused += 1
+        elif digest in embedded_rows:
+            embeddings[row] = embeddings[embedded_rows[digest]]
+        else:
+            embeddings[row] = embedder.embed(text, idf)
+            embedded_rows[digest] = row
+
+    # Write into a temporary directory and rename it, so a crash never leaves a partial index
+    temp_dir = os.path.join(index_dir, f".{os.path.basename(target)}.{os.getpid()}.tmp")
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    np.save(os.path.join(temp_dir, EMBEDDINGS_FILE), embeddings)
+    np.save(os.path.join(temp_dir, DOCUMENT_FREQUENCIES_FILE), document_frequencies)
+    with open(os.path.join(temp_dir, METADATA_FILE), 'w') as f:
+        json.dump({
+            "version": version,
+            "embedder": embedder.config(),
+            "document_count": document_count,
+            "passages": [[key, field, digest] for (key, field, _), digest in zip(passages, digests)],
+        }, f)
+    shutil.rmtree(target, ignore_errors=True)
+    os.rename(temp_dir, target)
+
+    # Older versions are no longer needed; open memory maps stay valid after unlinking
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if path != target and not name.startswith('.') and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    return reused, len(embedded_rows)
+
+
+class DenseIndex:
+    """Read-only, memory-mapped passage embeddings for one ontology version"""
+
+    def __init__(self, index_dir, version, passages):
+        path = version_dir(index_dir, version)
+        metadata = _read_metadata(path)
+        if metadata["version"] != version:
+            raise ValueError(f"Dense index at {path} is for ontology version {metadata['version'][:12]}")
+        if [digest for _, _, digest in metadata["passages"]] != [passage_digest(passage_text(field, text)) for _, field, text in passages]:
+            raise ValueError(f"Dense index at {path} does not match the knowledge base passages")
+        self.passages = passages
+        self.embedder = HashedNgramEmbedder.from_config(metadata["embedder"])
+        self.embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode='r')
+        self.idf = self.embedder.idf(
+            np.load(os.path.join(path, DOCUMENT_FREQUENCIES_FILE)), metadata["document_count"]
+        )
+
+    def __len__(self):
+        return len(self.passages)
+
+    @classmethod
+    def exists(cls, index_dir, version):
+        return os.path.exists(os.path.join(version_dir(index_dir, version), METADATA_FILE))
+
+    def scores(self, query, min_score=0.0):
+        """Cosine similarity of every passage to the query, zeroed below min_score"""
+        scores = self.embeddings @ self.embedder.embed(query, self.idf)
+        if min_score > 0:
+            scores[scores < min_score] = 0
+        return scores
+
+    def search_passages(self, query, k=5, min_score=0.0):
+        """Top-k passages as [(score, species key, field, text)], best first"""
+        scores = self.scores(query, min_score)
+        return [(float(scores[i]), *self.passages[i]) for i in top_k(scores, k) if scores[i] > 0]
+
+
+def hybrid_search(keyword_index, dense_index, query, k=5, dense_weight=0.5, min_dense_score=0.0):
+    """Top-k passages by a weighted sum of cosine similarity and max-normalised BM25
+
+    Both indexes must be built over the same passages in the same order.
+    Cosine similarities below min_dense_score count as 0, so a query that
+    only shares incidental n-grams with the ontology (e.g. "hi") gets nothing.
+    """
+    scores = dense_weight * dense_index.scores(query, min_dense_score)
+    keyword_scores = keyword_index.scores(query)
+    if keyword_scores is not None:
+        scores += (1 - dense_weight) * keyword_scores / keyword_scores.max()
+    return [(float(scores[i]), *dense_index.passages[i]) for i in top_k(scores, k) if scores[i] > 0]
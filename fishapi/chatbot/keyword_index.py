@@ -0,0 +1,93 @@
+"""
+BM25 keyword index over ontology literals
+Every literal field of every species record is a passage; BM25 term weights
+are precomputed per posting, so a query only sums the postings of its terms
+"""
+import math
+import re
+import numpy as np
+from fishapi.ranking import top_k
+
+WORD = re.compile(r"[^\W_]+")
+
+# Words that carry no meaning for species retrieval
+STOPWORDS = frozenset("""
+a about all an and any are as at be by can do does for from has have how i in
+is it its me of on or please tell than that the their them there these they
+this to was what when where which who why will with you your fish fishes species
+""".split())
+
+# Fixed names whose words would otherwise match unrelated queries ("red" fish)
+PHRASES = re.compile(r"\bred\s+list\b", re.IGNORECASE)
+
+# Record fields that are identifiers rather than descriptive text
+SKIPPED_FIELDS = ('id',)
+
+
+def terms(text, stopwords=STOPWORDS):
+    text = PHRASES.sub('redlist', text.lower())
+    return [word for word in WORD.findall(text) if word not in stopwords]
+
+
+def species_passages(fish_species_mapping):
+    """(species key, field, text) for every non-empty literal field of every species
+
+    A text repeated in several fields of a species (e.g. description and
+    morphology) is only kept once.
+    """
+    passages = []
+    for key, record in fish_species_mapping.items():
+        seen = set()
+        for field, value in record.items():
+            if field in SKIPPED_FIELDS or not value or value in seen:
+                continue
+            seen.add(value)
+            passages.append((key, field, value))
+    return passages
+
+
+class KeywordIndex:
+    """Inverted index with BM25 scoring over species passages"""
+
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = passages
+
+        term_frequencies = {}
+        lengths = np.zeros(len(passages), dtype=np.float32)
+        for passage_id, (_, _, text) in enumerate(passages):
+            passage_terms = terms(text)
+            lengths[passage_id] = len(passage_terms)
+            for term in passage_terms:
+                counts = term_frequencies.setdefault(term, {})
+                counts[passage_id] = counts.get(passage_id, 0) + 1
+
+        average_length = float(lengths.mean()) if len(passages) else 0.0
+        # term -> (passage ids, BM25 weights)
+        self.postings = {}
+        for term, counts in term_frequencies.items():
+            ids = np.fromiter(counts.keys(), dtype=np.int32, count=len(counts))
+            tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            idf = math.log(1 + (len(passages) - len(counts) + 0.5) / (len(counts) + 0.5))
+            norm = k1 * (1 - b + b * lengths[ids] / average_length)
+            self.postings[term] = (ids, (idf * tf * (k1 + 1) / (tf + norm)).astype(np.float32))
+
+    def __len__(self):
+        return len(self.passages)
+
+    def scores(self, query):
+        """BM25 score of every passage, or None when no query term is indexed"""
+        query_postings = [self.postings[term] for term in set(terms(query)) if term in self.postings]
+        if not query_postings:
+            return None
+        scores = np.zeros(len(self.passages), dtype=np.float32)
+        for ids, weights in query_postings:
+            # Passage ids are unique within a posting list
+            scores[ids] += weights
+        return scores
+
+    def search_passages(self, query, k=5):
+        """Top-k passages as [(score, species key, field, text)], best first"""
+        scores = self.scores(query)
+        if scores is None:
+            return []
+        return [(float(scores[i]), *self.passages[i]) for i in top_k(scores, k) if scores[i] > 0]
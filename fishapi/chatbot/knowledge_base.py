@@ -0,0 +1,343 @@
+"""
+Process-wide species knowledge base
+The OWL ontology is parsed and its species records extracted once per
+process (or loaded from a precompiled snapshot); RAGService, OntologyService,
+ChatbotService and the classify app all read the same records
+"""
+import os
+import threading
+from django.conf import settings
+from .ontology_snapshot import source_hash, load_snapshot, write_snapshot
+from .species_matcher import SpeciesMatcher, species_names
+from .keyword_index import KeywordIndex, species_passages
+from .dense_index import open_dense_index, hybrid_search
+
+FISH_NAMESPACE = "http://www.freshwaterfish.org/ontology#"
+
+# Base properties of every species record; everything else the ontology says
+# about a species is listed by OntologyService as additional information
+BASE_PROPERTIES = (
+    'ScientificName', 'CommonName', 'SinhalaName', 'Family', 'Order',
+    'Habitat', 'MaximumLengthCm', 'IUCNStatus', 'MorphologyDescription',
+)
+
+# Species records used when the ontology cannot be loaded
+FALLBACK_SPECIES = {
+    "puntius_titteya": {
+        "id": "http://www.freshwaterfish.org/ontology#Puntius_titteya",
+        "scientific": "Puntius titteya",
+        "vernacular": "le titteya",
+        "common": "cherry barb",
+        "family": "Cyprinidae",
+        "order": "Cypriniformes",
+        "habitat": "Freshwater, prefers still pools over fast-flowing areas",
+        "max_length": "5.0 cm TL",
+        "iucn_status": "Vulnerable (VU)",
+        "description": "Cherry Barb has an elongated body with a pair of maxillary barbels"
+    },
+    "devario_pathirana": {
+        "id": "http://www.freshwaterfish.org/ontology#Devario_pathirana",
+        "scientific": "Devario pathirana",
+        "vernacular": "pathirana saalaya",
+        "common": "Barred Danio, Sri Lanka Barred Danio",
+        "family": "Danionidae",
+        "order": "Cypriniformes",
+        "habitat": "Freshwater, prefers still pools over fast-flowing areas",
+        "max_length": "6.0 cm SL",
+        "iucn_status": "Endangered (EN)",
+        "description": "Compressed body, dorsally greenish-brown, lighter laterally with metallic blue bars"
+    },
+    "dawkinsia_srilankensis": {
+        "id": "http://www.freshwaterfish.org/ontology#Dawkinsia_srilankensis",
+        "scientific": "Dawkinsia srilankensis",
+        "vernacular": "Mal Pethiya",
+        "common": "Sri Lanka Blotched Filamented Barb, Blotched Filamented Barb",
+        "family": "Cyprinidae",
+        "order": "Cypriniformes",
+        "habitat": "Freshwater; benthopelagic; tropical. Prefers fast flowing streams",
+        "max_length": "10.0 cm TL",
+        "iucn_status": "Endangered (EN)",
+        "description": "Slightly elongated body with terminal mouth, no barbels. Three distinct black blotches laterally"
+    },
+    "pethia_cumingii": {
+        "id": "http://www.freshwaterfish.org/ontology#Pethia_cumingii",
+        "scientific": "Pethia cumingii",
+        "vernacular": "Kahavaral Depulliya /Potaya",
+        "common": "Cuming's Barb, Two spot barb",
+        "family": "Cyprinidae",
+        "order": "Cypriniformes",
+        "habitat": "Freshwater; benthopelagic. Clear, shallow, slow flowing, shaded streams",
+        "max_length": "5.0 cm TL",
+        "iucn_status": "Endangered (EN)",
+        "description": "Laterally compressed body with two vertically elongated blotches"
+    },
+    "belontia_signata": {
+        "id": "http://www.freshwaterfish.org/ontology#Belontia_signata",
+        "scientific": "Belontia signata",
+        "vernacular": "Thalkossa",
+        "common": "Ceylonese Combtail",
+        "family": "Osphronemidae",
+        "order": "Anabantiformes",
+        "habitat": "Freshwater, prefers slow-flowing, clear streams with sandy or rocky substrates",
+        "max_length": "18.0 cm TL",
+        "iucn_status": "Vulnerable (VU)",
+        "description": "Compressed body with elongated, pointed dorsal and anal fins"
+    },
+    "pethia_nigrofasciata": {
+        "id": "http://www.freshwaterfish.org/ontology#Pethia_nigrofasciata",
+        "scientific": "Pethia nigrofasciata",
+        "vernacular": "Bulath Hapaya / Manamaalaya",
+        "common": "Sri Lanka Black Ruby Barb, Black Ruby Barb",
+        "family": "Cyprinidae",
+        "order": "Cypriniformes",
+        "habitat": "Freshwater; benthopelagic. Clear waters with rocky and sandy substrata",
+        "max_length": "6.0 cm TL",
+        "iucn_status": "Vulnerable (VU)",
+        "description": "Compressed body with three black vertical bands"
+    }
+}
+
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+SPECIES_CLASS = FISH_NAMESPACE + "FishSpecies"
+
+# Species record field -> ontology property. Records are only built for
+# FishSpecies individuals that have every required property; optional fields
+# default to "". A property with several values keeps its first one.
+SPECIES_FIELDS = (
+    # (field, property, required)
+    ("scientific", "ScientificName", True),
+    ("vernacular", "SinhalaName", True),
+    ("common", "CommonName", True),
+    ("family", "Family", True),
+    ("order", "Order", True),
+    ("habitat", "Habitat", True),
+    ("max_length", "MaximumLengthCm", True),
+    ("iucn_status", "IUCNStatus", True),
+    ("description", "MorphologyDescription", True),
+    ("morphology", "MorphologyDescription", False),
+    ("ecology", "EcologyBehavior", False),
+    ("diet", "Diet", False),
+    ("reproduction", "Reproduction", False),
+    ("distribution", "Distribution", False),
+    ("specific_location", "SpecificLocation", False),
+    ("status_notes", "StatusNotes", False),
+    ("authority", "Authority", False),
+    ("etymology", "Etymology", False),
+    ("colour_variants", "ColourMorphsVariants", False),
+    ("temperature_range", "TemperatureRange", False),
+    ("ph_range", "PHRange", False),
+    ("dh_range", "DHRange", False),
+    ("latitude", "Latitude", False),
+    ("region", "Region", False),
+    ("countries", "Countries", False),
+    ("threat_to_humans", "ThreatToHumans", False),
+    ("fisheries_value", "FisheriesValue", False),
+    ("aquarium_group_size", "AquariumGroupSize", False),
+    ("aquarium_tank_size", "AquariumMinimumTankSizeCm", False),
+    ("hatching", "Hatching", False),
+    ("free_swimming", "FreeSwimmingAfter", False),
+    ("maturity", "Maturity", False),
+    ("common_length", "CommonLengthCm", False),
+    ("subfamily", "Subfamily", False),
+)
+
+
+def species_key(scientific_name):
+    return scientific_name.lower().replace(' ', '_')
+
+
+def extract_species(graph):
+    """Build species records and their additional properties in one pass over the graph's triples
+
+    Returns (fish_species_mapping, additional_properties), both keyed by
+    species key, with species in the graph's rdf:type index order (the order
+    the SPARQL extraction used to return them in).
+    """
+    from rdflib import URIRef
+
+    base_uris = {FISH_NAMESPACE + name for name in BASE_PROPERTIES}
+    mapped_uris = {FISH_NAMESPACE + prop for _, prop, _ in SPECIES_FIELDS}
+
+    values = {}      # subject -> {property: first value}
+    additional = {}  # subject -> [(property name, value)]
+    for subject, prop, value in graph:
+        subject, prop, value = str(subject), str(prop), str(value)
+        if prop in mapped_uris:
+            values.setdefault(subject, {}).setdefault(prop, value)
+        if prop not in base_uris:
+            property_name = prop.split('#')[-1] if '#' in prop else prop
+            additional.setdefault(subject, []).append((property_name, value))
+
+    fish_species_mapping = {}
+    additional_properties = {}
+    for subject in graph.subjects(URIRef(RDF_TYPE), URIRef(SPECIES_CLASS), unique=True):
+        subject = str(subject)
+        properties = values.get(subject, {})
+        record = {"id": subject}
+        for field, prop, required in SPECIES_FIELDS:
+            value = properties.get(FISH_NAMESPACE + prop)
+            if value is None:
+                if required:
+                    break
+                value = ""
+            record[field] = value
+        else:
+            key = species_key(record["scientific"])
+            fish_species_mapping[key] = record
+            additional_properties[key] = additional.get(subject, [])
+    return fish_species_mapping, additional_properties
+
+
+def rank_species(hits, k=3):
+    """Top-k species by the summed score of their passages in hits, as [(species key, score)]
+
+    hits are search_passages results, so species are ranked by whichever
+    retrieval produced them rather than by a second index; ties keep the
+    order of each species' best passage.
+    """
+    totals = {}
+    for score, key, _, _ in hits:
+        totals[key] = totals.get(key, 0.0) + score
+    return sorted(totals.items(), key=lambda item: -item[1])[:k]
+
+
+class KnowledgeBase:
+    """Species records extracted from the OWL ontology
+
+    fish_species_mapping maps species keys (scientific name, lower-cased,
+    underscored) to record dicts and must be treated as read-only, as it is
+    shared by every service and request in the process.
+    """
+
+    def __init__(self, ontology_path, snapshot_path=None, dense_index_dir=None):
+        self.ontology_path = ontology_path
+        self.snapshot_path = snapshot_path
+        self.dense_index_dir = dense_index_dir
+        self.fish_species_mapping = {}
+        self.additional_properties = {}
+        # BM25 index over the records' literal fields
+        self.keyword_index = None
+        # Memory-mapped passage embeddings, or None when disabled or unavailable
+        self.dense_index = None
+        # False when the ontology could not be loaded and FALLBACK_SPECIES is used
+        self.from_ontology = False
+        # 'snapshot', 'ontology' or 'fallback'
+        self.source = None
+        # SHA-256 of the ontology the records came from, or 'fallback'
+        self.version = None
+        self._load()
+        # Species name matcher shared by the chatbot services, built once per knowledge base version
+        self.species_matcher = SpeciesMatcher(species_names(self.fish_species_mapping))
+        if self.dense_index_dir:
+            self.dense_index = self._load_dense_index()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.ontology_path):
+                ontology_hash = source_hash(self.ontology_path)
+                self.version = ontology_hash
+                state = load_snapshot(self.snapshot_path, ontology_hash) if self.snapshot_path else None
+                if state is not None:
+                    self._set_state(state)
+                    self.source = 'snapshot'
+                    print(f"Loaded {len(self.fish_species_mapping)} fish species from ontology snapshot {self.snapshot_path}")
+                    return
+
+                self._set_state(self.parse_ontology(self.ontology_path))
+                self.source = 'ontology'
+                print(f"Extracted comprehensive data for {len(self.fish_species_mapping)} fish species from OWL ontology")
+                if self.snapshot_path:
+                    self._write_snapshot(ontology_hash)
+            else:
+                print(f"OWL file not found at {self.ontology_path}")
+                self._use_fallback()
+        except Exception as e:
+            print(f"Error loading OWL ontology: {e}")
+            self._use_fallback()
+
+    @staticmethod
+    def parse_ontology(ontology_path):
+        """Parse the OWL file with rdflib and extract the knowledge base state"""
+        from rdflib import Graph
+        graph = Graph()
+        graph.parse(ontology_path, format="xml")
+        print(f"OWL Ontology loaded successfully from {ontology_path}")
+        fish_species_mapping, additional_properties = extract_species(graph)
+        return {
+            "fish_species_mapping": fish_species_mapping,
+            "additional_properties": additional_properties,
+            "keyword_index": KeywordIndex(species_passages(fish_species_mapping)),
+        }
+
+    def state(self):
+        """Everything extracted from the ontology and indexed, as stored in snapshots"""
+        return {
+            "fish_species_mapping": self.fish_species_mapping,
+            "additional_properties": self.additional_properties,
+            "keyword_index": self.keyword_index,
+        }
+
+    def _set_state(self, state):
+        self.fish_species_mapping = state["fish_species_mapping"]
+        self.additional_properties = state["additional_properties"]
+        self.keyword_index = state["keyword_index"]
+        self.from_ontology = True
+
+    def _write_snapshot(self, ontology_hash):
+        # Refresh a missing or stale snapshot so the next worker starts from it
+        try:
+            write_snapshot(self.snapshot_path, ontology_hash, self.state())
+            print(f"Wrote ontology snapshot {self.snapshot_path}")
+        except OSError as e:
+            print(f"Could not write ontology snapshot {self.snapshot_path}: {e}")
+
+    def _load_dense_index(self):
+        # Open the index for this ontology version, embedding changed passages first if it is missing
+        try:
+            dense_index, built = open_dense_index(self.dense_index_dir, self.keyword_index.passages, self.version)
+            if built is not None:
+                print(f"Updated dense passage index {self.dense_index_dir} ({built[0]} passages reused, {built[1]} embedded)")
+            return dense_index
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Dense passage index unavailable, using keyword retrieval only: {e}")
+            return None
+
+    def search_passages(self, query, k=5, retrieval='hybrid', dense_weight=0.5, min_dense_score=0.0):
+        """Top-k passages for a query as [(score, species key, field, text)]
+
+        retrieval is 'keyword' (BM25), 'dense' (embedding cosine) or 'hybrid'
+        (both, weighted by dense_weight); without a dense index it is always
+        'keyword'. Cosine similarities below min_dense_score are ignored.
+        """
+        if self.dense_index is None or retrieval == 'keyword':
+            return self.keyword_index.search_passages(query, k)
+        if retrieval == 'dense':
+            return self.dense_index.search_passages(query, k, min_dense_score)
+        return hybrid_search(self.keyword_index, self.dense_index, query, k, dense_weight, min_dense_score)
+
+    def _use_fallback(self):
+        print("Creating fallback data...")
+        self.fish_species_mapping = FALLBACK_SPECIES
+        self.additional_properties = {}
+        self.keyword_index = KeywordIndex(species_passages(FALLBACK_SPECIES))
+        self.from_ontology = False
+        self.source = 'fallback'
+        self.version = 'fallback'
+
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    """The process-wide KnowledgeBase, built on first use"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase(
+                    settings.CHATBOT_ONTOLOGY_PATH, settings.CHATBOT_ONTOLOGY_SNAPSHOT,
+                    settings.CHATBOT_DENSE_INDEX_DIR
+                )
+    return _knowledge_base
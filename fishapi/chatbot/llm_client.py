@@ -0,0 +1,40 @@
+"""
+Shared DeepSeek API client
+One OpenAI-compatible client per process, reused by every chatbot service and request
+"""
+import os
+import threading
+
+_client = None
+_client_initialized = False
+_client_lock = threading.Lock()
+
+
+def get_deepseek_client():
+    """The process-wide DeepSeek client, or None when no API key is set or the client cannot be created"""
+    global _client, _client_initialized
+    if not _client_initialized:
+        with _client_lock:
+            if not _client_initialized:
+                _client = _create_client()
+                _client_initialized = True
+    return _client
+
+
+def _create_client():
+    api_key = os.getenv("DEEPSEEK_API_KEY")
+    if not api_key:
+        print("DEEPSEEK_API_KEY not found in environment variables")
+        return None
+    try:
+        # Imported here so processes that never chat skip the OpenAI SDK
+        import openai
+        client = openai.OpenAI(
+            api_key=api_key,
+            base_url="https://api.deepseek.com"
+        )
+        print("DeepSeek API client initialized successfully")
+        return client
+    except Exception as e:
+        print(f"Failed to initialize DeepSeek client: {e}")
+        return None
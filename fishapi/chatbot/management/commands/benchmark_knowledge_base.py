@@ -0,0 +1,47 @@
+import time
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from chatbot.knowledge_base import KnowledgeBase, get_knowledge_base
+from chatbot.llm_client import _create_client
+from chatbot.rag_service import RAGService
+
+QUERIES = (
+    'tell me about bulath hapaya',
+    'where does the cherry barb live',
+    'is the combtail endangered',
+    'hi',
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request chat setup cost with and without the shared knowledge base'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20)
+
+    def handle(self, *args, **options):
+        total = options['requests']
+
+        def per_request_rebuild(query):
+            # What every chat request used to do: new client, ontology parse and extraction
+            client = _create_client()
+            RAGService(KnowledgeBase(settings.CHATBOT_ONTOLOGY_PATH), client)._retrieve_information(query)
+
+        def shared(query):
+            RAGService()._retrieve_information(query)
+
+        start = time.perf_counter()
+        get_knowledge_base()
+        self.stdout.write(f"Shared knowledge base built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        self.stdout.write(f"{'setup':24} {'mean ms':>9} {'p95 ms':>8}")
+        for name, handler in (('per-request rebuild', per_request_rebuild), ('shared knowledge base', shared)):
+            latencies = []
+            for i in range(total):
+                start = time.perf_counter()
+                handler(QUERIES[i % len(QUERIES)])
+                latencies.append(time.perf_counter() - start)
+            latencies = np.array(latencies) * 1000
+            self.stdout.write(f"{name:24} {latencies.mean():>9.2f} {np.percentile(latencies, 95):>8.2f}")
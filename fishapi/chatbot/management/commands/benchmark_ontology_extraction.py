@@ -0,0 +1,191 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rdflib import Graph, Literal, URIRef
+from chatbot.knowledge_base import BASE_PROPERTIES, FISH_NAMESPACE, RDF_TYPE, SPECIES_CLASS, extract_species
+
+# Optional properties given a second value by --multi-valued
+MULTI_VALUED_PROPERTIES = ('Diet', 'Region', 'Countries')
+
+# Species query previously run by RAGService._extract_fish_data
+SPARQL_QUERY = """
+SELECT ?fish ?scientificName ?commonName ?sinhalaName ?family ?order ?habitat ?maxLength ?iucnStatus ?description ?morphology ?ecology ?diet ?reproduction ?distribution ?specificLocation ?statusNotes ?authority ?etymology ?colourVariants ?temperatureRange ?phRange ?dhRange ?latitude ?region ?countries ?threatToHumans ?fisheriesValue ?aquariumGroupSize ?aquariumTankSize ?hatching ?freeSwimming ?maturity ?commonLength ?subfamily
+WHERE {
+    ?fish rdf:type fish:FishSpecies .
+    ?fish fish:ScientificName ?scientificName .
+    ?fish fish:CommonName ?commonName .
+    ?fish fish:SinhalaName ?sinhalaName .
+    ?fish fish:Family ?family .
+    ?fish fish:Order ?order .
+    ?fish fish:Habitat ?habitat .
+    ?fish fish:MaximumLengthCm ?maxLength .
+    ?fish fish:IUCNStatus ?iucnStatus .
+    ?fish fish:MorphologyDescription ?description .
+    OPTIONAL { ?fish fish:MorphologyDescription ?morphology }
+    OPTIONAL { ?fish fish:EcologyBehavior ?ecology }
+    OPTIONAL { ?fish fish:Diet ?diet }
+    OPTIONAL { ?fish fish:Reproduction ?reproduction }
+    OPTIONAL { ?fish fish:Distribution ?distribution }
+    OPTIONAL { ?fish fish:SpecificLocation ?specificLocation }
+    OPTIONAL { ?fish fish:StatusNotes ?statusNotes }
+    OPTIONAL { ?fish fish:Authority ?authority }
+    OPTIONAL { ?fish fish:Etymology ?etymology }
+    OPTIONAL { ?fish fish:ColourMorphsVariants ?colourVariants }
+    OPTIONAL { ?fish fish:TemperatureRange ?temperatureRange }
+    OPTIONAL { ?fish fish:PHRange ?phRange }
+    OPTIONAL { ?fish fish:DHRange ?dhRange }
+    OPTIONAL { ?fish fish:Latitude ?latitude }
+    OPTIONAL { ?fish fish:Region ?region }
+    OPTIONAL { ?fish fish:Countries ?countries }
+    OPTIONAL { ?fish fish:ThreatToHumans ?threatToHumans }
+    OPTIONAL { ?fish fish:FisheriesValue ?fisheriesValue }
+    OPTIONAL { ?fish fish:AquariumGroupSize ?aquariumGroupSize }
+    OPTIONAL { ?fish fish:AquariumMinimumTankSizeCm ?aquariumTankSize }
+    OPTIONAL { ?fish fish:Hatching ?hatching }
+    OPTIONAL { ?fish fish:FreeSwimmingAfter ?freeSwimming }
+    OPTIONAL { ?fish fish:Maturity ?maturity }
+    OPTIONAL { ?fish fish:CommonLengthCm ?commonLength }
+    OPTIONAL { ?fish fish:Subfamily ?subfamily }
+}
+"""
+
+
+def sparql_extract_species(graph):
+    """Reference extractor: the 25-OPTIONAL SPARQL query previously used by RAGService"""
+    mapping = {}
+    results = graph.query(SPARQL_QUERY)
+
+    for row in results:
+        fish_uri = str(row.fish)
+        scientific_name = str(row.scientificName)
+        common_name = str(row.commonName)
+        sinhala_name = str(row.sinhalaName)
+        family = str(row.family)
+        order = str(row.order)
+        habitat = str(row.habitat)
+        max_length = str(row.maxLength)
+        iucn_status = str(row.iucnStatus)
+        description = str(row.description)
+
+        # Create a key for mapping
+        key = scientific_name.lower().replace(' ', '_')
+
+        mapping[key] = {
+            "id": fish_uri,
+            "scientific": scientific_name,
+            "vernacular": sinhala_name,
+            "common": common_name,
+            "family": family,
+            "order": order,
+            "habitat": habitat,
+            "max_length": max_length,
+            "iucn_status": iucn_status,
+            "description": description,
+            "morphology": str(row.morphology) if row.morphology else "",
+            "ecology": str(row.ecology) if row.ecology else "",
+            "diet": str(row.diet) if row.diet else "",
+            "reproduction": str(row.reproduction) if row.reproduction else "",
+            "distribution": str(row.distribution) if row.distribution else "",
+            "specific_location": str(row.specificLocation) if row.specificLocation else "",
+            "status_notes": str(row.statusNotes) if row.statusNotes else "",
+            "authority": str(row.authority) if row.authority else "",
+            "etymology": str(row.etymology) if row.etymology else "",
+            "colour_variants": str(row.colourVariants) if row.colourVariants else "",
+            "temperature_range": str(row.temperatureRange) if row.temperatureRange else "",
+            "ph_range": str(row.phRange) if row.phRange else "",
+            "dh_range": str(row.dhRange) if row.dhRange else "",
+            "latitude": str(row.latitude) if row.latitude else "",
+            "region": str(row.region) if row.region else "",
+            "countries": str(row.countries) if row.countries else "",
+            "threat_to_humans": str(row.threatToHumans) if row.threatToHumans else "",
+            "fisheries_value": str(row.fisheriesValue) if row.fisheriesValue else "",
+            "aquarium_group_size": str(row.aquariumGroupSize) if row.aquariumGroupSize else "",
+            "aquarium_tank_size": str(row.aquariumTankSize) if row.aquariumTankSize else "",
+            "hatching": str(row.hatching) if row.hatching else "",
+            "free_swimming": str(row.freeSwimming) if row.freeSwimming else "",
+            "maturity": str(row.maturity) if row.maturity else "",
+            "common_length": str(row.commonLength) if row.commonLength else "",
+            "subfamily": str(row.subfamily) if row.subfamily else ""
+        }
+
+    return mapping
+
+
+def sparql_additional_properties(graph, mapping):
+    """Reference lookup: the per-species query previously run by OntologyService"""
+    filters = "\n".join(f"FILTER(?property != fish:{name})" for name in BASE_PROPERTIES)
+    additional = {}
+    for key, info in mapping.items():
+        query = f"SELECT ?property ?value WHERE {{ <{info['id']}> ?property ?value . {filters} }}"
+        details = []
+        for row in graph.query(query):
+            property_name = str(row.property).split('#')[-1] if '#' in str(row.property) else str(row.property)
+            details.append((property_name, str(row.value)))
+        additional[key] = details
+    return additional
+
+
+def scaled_graph(graph, copies, multi_valued=False):
+    """A graph holding `copies` renamed copies of every species in graph"""
+    species = set(graph.subjects(URIRef(RDF_TYPE), URIRef(SPECIES_CLASS)))
+    scientific_name = URIRef(FISH_NAMESPACE + 'ScientificName')
+    multi = {URIRef(FISH_NAMESPACE + name) for name in MULTI_VALUED_PROPERTIES}
+    scaled = Graph()
+    for prefix, namespace in graph.namespaces():
+        scaled.bind(prefix, namespace)
+    for subject, prop, value in graph:
+        if subject not in species:
+            scaled.add((subject, prop, value))
+            continue
+        for i in range(copies):
+            copy = URIRef(f"{subject}_{i}")
+            scaled.add((copy, prop, Literal(f"{value} {i}") if prop == scientific_name else value))
+            if multi_valued and prop in multi:
+                scaled.add((copy, prop, Literal(f"{value} (alternative)")))
+    return scaled
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Check the single-pass species extractor against the SPARQL query and benchmark both on scaled ontologies'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ontology', default=settings.CHATBOT_ONTOLOGY_PATH)
+        parser.add_argument('--copies', default='1,10,100', help='Comma separated copies of each species')
+        parser.add_argument('--multi-valued', action='store_true',
+                            help=f"Give {', '.join(MULTI_VALUED_PROPERTIES)} two values per species")
+
+    def handle(self, *args, **options):
+        graph = Graph()
+        graph.parse(options['ontology'], format="xml")
+
+        # Equivalence on the ontology as shipped
+        expected = sparql_extract_species(graph)
+        expected_additional = sparql_additional_properties(graph, expected)
+        mapping, additional = extract_species(graph)
+        if mapping != expected or list(mapping) != list(expected):
+            raise CommandError('Species records differ from the SPARQL extraction')
+        for key in expected:
+            if sorted(additional[key]) != sorted(expected_additional[key]):
+                raise CommandError(f"Additional properties of {key} differ from the SPARQL lookup")
+        self.stdout.write(self.style.SUCCESS(
+            f"Single-pass extraction matches the SPARQL query for all {len(mapping)} species"
+        ))
+
+        self.stdout.write(f"{'species':>8} {'triples':>9} {'SPARQL rows':>12} {'SPARQL ms':>10} {'scan ms':>9}")
+        for copies in [int(c) for c in options['copies'].split(',')]:
+            scaled = scaled_graph(graph, copies, options['multi_valued'])
+            rows, _ = timed(lambda g: len(g.query(SPARQL_QUERY)), scaled)
+            sparql_mapping, sparql_ms = timed(
+                lambda g: sparql_additional_properties(g, sparql_extract_species(g)), scaled
+            )
+            (scan_mapping, _), scan_ms = timed(extract_species, scaled)
+            self.stdout.write(
+                f"{len(scan_mapping):>8} {len(scaled):>9} {rows:>12} {sparql_ms:>10.1f} {scan_ms:>9.1f}"
+            )
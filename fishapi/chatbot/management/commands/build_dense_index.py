@@ -0,0 +1,56 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from chatbot.knowledge_base import KnowledgeBase
+from chatbot.dense_index import DenseIndex, build_dense_index, hybrid_search
+
+
+class Command(BaseCommand):
+    help = 'Embed the ontology passages into the memory-mapped dense retrieval index'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ontology', default=settings.CHATBOT_ONTOLOGY_PATH)
+        parser.add_argument('--snapshot', default=settings.CHATBOT_ONTOLOGY_SNAPSHOT)
+        parser.add_argument('--output', default=settings.CHATBOT_DENSE_INDEX_DIR)
+        parser.add_argument('--full', action='store_true',
+                            help='Re-fit document frequencies and re-embed every passage')
+        parser.add_argument('--query', action='append', default=[],
+                            help='Show the top passages of each retriever for this query (repeatable)')
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError("No index directory: set CHATBOT_DENSE_INDEX_DIR or pass --output")
+
+        knowledge_base = KnowledgeBase(options['ontology'], options['snapshot'])
+        passages = knowledge_base.keyword_index.passages
+
+        start = time.perf_counter()
+        reused, embedded = build_dense_index(
+            options['output'], passages, knowledge_base.version, full=options['full']
+        )
+        build_ms = (time.perf_counter() - start) * 1000
+        dense_index = DenseIndex(options['output'], knowledge_base.version, passages)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['output']} ({len(passages)} passages, {reused} reused, {embedded} embedded, "
+            f"{dense_index.embedder.dimensions} dimensions) in {build_ms:.1f} ms"
+        ))
+
+        for query in options['query']:
+            self.stdout.write(f"\n{query!r}")
+            retrievers = (
+                ('keyword', lambda: knowledge_base.keyword_index.search_passages(query, 3)),
+                ('dense', lambda: dense_index.search_passages(query, 3, settings.CHATBOT_DENSE_MIN_SCORE)),
+                ('hybrid', lambda: hybrid_search(
+                    knowledge_base.keyword_index, dense_index, query, 3,
+                    settings.CHATBOT_HYBRID_DENSE_WEIGHT, settings.CHATBOT_DENSE_MIN_SCORE
+                )),
+            )
+            for name, search in retrievers:
+                start = time.perf_counter()
+                results = search()
+                search_ms = (time.perf_counter() - start) * 1000
+                self.stdout.write(f"  {name} ({search_ms:.2f} ms)")
+                for score, key, field, text in results:
+                    self.stdout.write(f"    {score:.3f}  {key}.{field}: {text[:70]}")
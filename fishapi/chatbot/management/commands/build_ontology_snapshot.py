@@ -0,0 +1,32 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from chatbot.knowledge_base import KnowledgeBase
+from chatbot.ontology_snapshot import source_hash, load_snapshot, write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Compile the OWL ontology into a snapshot that workers load instead of parsing it with rdflib'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ontology', default=settings.CHATBOT_ONTOLOGY_PATH)
+        parser.add_argument('--output', default=settings.CHATBOT_ONTOLOGY_SNAPSHOT)
+
+    def handle(self, *args, **options):
+        ontology_hash = source_hash(options['ontology'])
+
+        start = time.perf_counter()
+        state = KnowledgeBase.parse_ontology(options['ontology'])
+        parse_ms = (time.perf_counter() - start) * 1000
+        write_snapshot(options['output'], ontology_hash, state)
+
+        start = time.perf_counter()
+        load_snapshot(options['output'], source_hash(options['ontology']))
+        load_ms = (time.perf_counter() - start) * 1000
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['output']} ({len(state['fish_species_mapping'])} species, "
+            f"source sha256 {ontology_hash[:12]})"
+        ))
+        self.stdout.write(f"rdflib parse + extraction: {parse_ms:.1f} ms, snapshot load: {load_ms:.2f} ms")
@@ -0,0 +1,50 @@
+"""
+Precompiled ontology snapshots
+The species records extracted from the OWL file are stored as a pickle keyed
+by the SHA-256 of the source file, so workers can skip rdflib parsing when the
+ontology has not changed since the snapshot was built
+"""
+import hashlib
+import os
+import pickle
+
+# Bump when the extracted state changes shape, so older snapshots are rebuilt
+SNAPSHOT_VERSION = 4
+
+
+def source_hash(path):
+    """SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_snapshot(snapshot_path, expected_hash):
+    """The state stored in a snapshot, or None if it is missing, unreadable or stale"""
+    try:
+        with open(snapshot_path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignoring unreadable ontology snapshot {snapshot_path}: {e}")
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+        return None
+    if snapshot.get('source_hash') != expected_hash:
+        return None
+    return snapshot['state']
+
+
+def write_snapshot(snapshot_path, source_sha256, state):
+    """Write a snapshot atomically, so concurrently starting workers never read a partial file"""
+    os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+    temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump(
+            {"version": SNAPSHOT_VERSION, "source_hash": source_sha256, "state": state},
+            f, protocol=pickle.HIGHEST_PROTOCOL
+        )
+    os.replace(temp_path, snapshot_path)
@@ -3,13 +3,15 @@ RAG (Retrieval-Augmented Generation) Service for Fish Ontology
 Combines OWL ontology retrieval with DeepSeek LLM generation
 """
 import os
-import openai
 from dotenv import load_dotenv
-from rdflib import Graph, Literal, URIRef
-from rdflib.namespace import RDF, RDFS, Namespace
-from django.conf import settings
 import json
 import re
+from django.conf import settings
+from .knowledge_base import get_knowledge_base, rank_species
+from .llm_client import get_deepseek_client
+from .context_builder import ContextBuilder, response_max_tokens
+from .answer_cache import get_answer_cache, answer_key
+from .semantic_cache import get_semantic_cache, residual_words
 
 # Load environment variables
 try:
@@ -18,169 +20,33 @@ except Exception as e:
     print(f"Warning: Could not load .env file: {e}")
     os.environ.setdefault('DEEPSEEK_API_KEY', 'sk-e27dc948ee3545d5ab92fbafdf55b171')
 
-class RAGService:
-    def __init__(self):
-        self.client = None
-        self.graph = None
-        self.fish_species_mapping = {}
-        self._initialize_deepseek()
-        self._load_ontology()
-        self._extract_fish_data()
-
-    def _initialize_deepseek(self):
-        """Initialize DeepSeek API client"""
-        api_key = os.getenv("DEEPSEEK_API_KEY")
-        if api_key:
-            try:
-                self.client = openai.OpenAI(
-                    api_key=api_key,
-                    base_url="https://api.deepseek.com"
-                )
-                print("DeepSeek API client initialized successfully")
-            except Exception as e:
-                print(f"Failed to initialize DeepSeek client: {e}")
-        else:
-            print("DEEPSEEK_API_KEY not found in environment variables")
+# Part of the answer cache key: bump PROMPT_VERSION when the prompts below change
+DEEPSEEK_MODEL = "deepseek-chat"
+PROMPT_VERSION = 1
 
-    def _load_ontology(self):
-        """Load the fish ontology from OWL file"""
-        try:
-            ontology_path = os.path.join(settings.BASE_DIR, 'fish6species(1).owl')
-            if os.path.exists(ontology_path):
-                self.graph = Graph()
-                self.graph.parse(ontology_path, format="xml")
-                print(f"OWL Ontology loaded successfully from {ontology_path}")
-            else:
-                print(f"OWL file not found at {ontology_path}")
-                self._create_fallback_data()
-        except Exception as e:
-            print(f"Error loading OWL ontology: {e}")
-            self._create_fallback_data()
-
-    def _extract_fish_data(self):
-        """Extract comprehensive fish data from the OWL ontology"""
-        if not self.graph:
-            return
-        
-        # Define namespaces
-        fish_ns = Namespace("http://www.freshwaterfish.org/ontology#")
-        
-        # Enhanced query for comprehensive data extraction
-        query = """
-        SELECT ?fish ?scientificName ?commonName ?sinhalaName ?family ?order ?habitat ?maxLength ?iucnStatus ?description ?morphology ?ecology ?diet ?reproduction ?distribution ?specificLocation ?statusNotes ?authority ?etymology ?colourVariants ?temperatureRange ?phRange ?dhRange ?latitude ?region ?countries ?threatToHumans ?fisheriesValue ?aquariumGroupSize ?aquariumTankSize ?hatching ?freeSwimming ?maturity ?commonLength ?subfamily
-        WHERE {
-            ?fish rdf:type fish:FishSpecies .
-            ?fish fish:ScientificName ?scientificName .
-            ?fish fish:CommonName ?commonName .
-            ?fish fish:SinhalaName ?sinhalaName .
-            ?fish fish:Family ?family .
-            ?fish fish:Order ?order .
-            ?fish fish:Habitat ?habitat .
-            ?fish fish:MaximumLengthCm ?maxLength .
-            ?fish fish:IUCNStatus ?iucnStatus .
-            ?fish fish:MorphologyDescription ?description .
-            OPTIONAL { ?fish fish:MorphologyDescription ?morphology }
-            OPTIONAL { ?fish fish:EcologyBehavior ?ecology }
-            OPTIONAL { ?fish fish:Diet ?diet }
-            OPTIONAL { ?fish fish:Reproduction ?reproduction }
-            OPTIONAL { ?fish fish:Distribution ?distribution }
-            OPTIONAL { ?fish fish:SpecificLocation ?specificLocation }
-            OPTIONAL { ?fish fish:StatusNotes ?statusNotes }
-            OPTIONAL { ?fish fish:Authority ?authority }
-            OPTIONAL { ?fish fish:Etymology ?etymology }
-            OPTIONAL { ?fish fish:ColourMorphsVariants ?colourVariants }
-            OPTIONAL { ?fish fish:TemperatureRange ?temperatureRange }
-            OPTIONAL { ?fish fish:PHRange ?phRange }
-            OPTIONAL { ?fish fish:DHRange ?dhRange }
-            OPTIONAL { ?fish fish:Latitude ?latitude }
-            OPTIONAL { ?fish fish:Region ?region }
-            OPTIONAL { ?fish fish:Countries ?countries }
-            OPTIONAL { ?fish fish:ThreatToHumans ?threatToHumans }
-            OPTIONAL { ?fish fish:FisheriesValue ?fisheriesValue }
-            OPTIONAL { ?fish fish:AquariumGroupSize ?aquariumGroupSize }
-            OPTIONAL { ?fish fish:AquariumMinimumTankSizeCm ?aquariumTankSize }
-            OPTIONAL { ?fish fish:Hatching ?hatching }
-            OPTIONAL { ?fish fish:FreeSwimmingAfter ?freeSwimming }
-            OPTIONAL { ?fish fish:Maturity ?maturity }
-            OPTIONAL { ?fish fish:CommonLengthCm ?commonLength }
-            OPTIONAL { ?fish fish:Subfamily ?subfamily }
-        }
-        """
-        
-        results = self.graph.query(query)
-        
-        for row in results:
-            fish_uri = str(row.fish)
-            scientific_name = str(row.scientificName)
-            common_name = str(row.commonName)
-            sinhala_name = str(row.sinhalaName)
-            family = str(row.family)
-            order = str(row.order)
-            habitat = str(row.habitat)
-            max_length = str(row.maxLength)
-            iucn_status = str(row.iucnStatus)
-            description = str(row.description)
-            
-            # Create a key for mapping
-            key = scientific_name.lower().replace(' ', '_')
-            
-            self.fish_species_mapping[key] = {
-                "id": fish_uri,
-                "scientific": scientific_name,
-                "vernacular": sinhala_name,
-                "common": common_name,
-                "family": family,
-                "order": order,
-                "habitat": habitat,
-                "max_length": max_length,
-                "iucn_status": iucn_status,
-                "description": description,
-                "morphology": str(row.morphology) if row.morphology else "",
-                "ecology": str(row.ecology) if row.ecology else "",
-                "diet": str(row.diet) if row.diet else "",
-                "reproduction": str(row.reproduction) if row.reproduction else "",
-                "distribution": str(row.distribution) if row.distribution else "",
-                "specific_location": str(row.specificLocation) if row.specificLocation else "",
-                "status_notes": str(row.statusNotes) if row.statusNotes else "",
-                "authority": str(row.authority) if row.authority else "",
-                "etymology": str(row.etymology) if row.etymology else "",
-                "colour_variants": str(row.colourVariants) if row.colourVariants else "",
-                "temperature_range": str(row.temperatureRange) if row.temperatureRange else "",
-                "ph_range": str(row.phRange) if row.phRange else "",
-                "dh_range": str(row.dhRange) if row.dhRange else "",
-                "latitude": str(row.latitude) if row.latitude else "",
-                "region": str(row.region) if row.region else "",
-                "countries": str(row.countries) if row.countries else "",
-                "threat_to_humans": str(row.threatToHumans) if row.threatToHumans else "",
-                "fisheries_value": str(row.fisheriesValue) if row.fisheriesValue else "",
-                "aquarium_group_size": str(row.aquariumGroupSize) if row.aquariumGroupSize else "",
-                "aquarium_tank_size": str(row.aquariumTankSize) if row.aquariumTankSize else "",
-                "hatching": str(row.hatching) if row.hatching else "",
-                "free_swimming": str(row.freeSwimming) if row.freeSwimming else "",
-                "maturity": str(row.maturity) if row.maturity else "",
-                "common_length": str(row.commonLength) if row.commonLength else "",
-                "subfamily": str(row.subfamily) if row.subfamily else ""
-            }
-        
-        print(f"Extracted comprehensive data for {len(self.fish_species_mapping)} fish species from OWL ontology")
+# Keywords that select the information a query asks for; the first intent with a match wins
+INTENT_KEYWORDS = {
+    "habitat": ["habitat", "where", "live", "environment", "water", "stream", "river"],
+    "conservation": ["conservation", "threat", "endangered", "vulnerable", "status", "iucn"],
+    "appearance": ["appearance", "look", "color", "size", "morphology", "shape", "body"],
+    "behavior": ["behavior", "behaviour", "ecology", "feeding", "diet", "reproduction"],
+    "distribution": ["distribution", "location", "found", "range", "basin", "district"],
+    "aquarium": ["aquarium", "tank", "captive", "breeding", "care", "maintenance"],
+    "general": ["tell me", "about", "information", "what is", "describe"]
+}
+# Words that only express the intent, ignored when comparing near-duplicate questions
+INTENT_WORDS = frozenset(word for keywords in INTENT_KEYWORDS.values() for keyword in keywords for word in keyword.split())
 
-    def _create_fallback_data(self):
-        """Create fallback data when OWL loading fails"""
-        print("Creating fallback data...")
-        self.fish_species_mapping = {
-            "puntius_titteya": {
-                "id": "http://www.freshwaterfish.org/ontology#Puntius_titteya",
-                "scientific": "Puntius titteya",
-                "vernacular": "le titteya",
-                "common": "cherry barb",
-                "family": "Cyprinidae",
-                "order": "Cypriniformes",
-                "habitat": "Freshwater, prefers still pools over fast-flowing areas",
-                "max_length": "5.0 cm TL",
-                "iucn_status": "Vulnerable (VU)",
-                "description": "Cherry Barb has an elongated body with a pair of maxillary barbels"
-            }
-        }
+class RAGService:
+    def __init__(self, knowledge_base=None, client=None):
+        # Species records and the API client are shared by every RAGService in the
+        # process unless given (the knowledge base benchmark passes its own)
+        self.knowledge_base = knowledge_base or get_knowledge_base()
+        self.fish_species_mapping = self.knowledge_base.fish_species_mapping
+        self.client = client or get_deepseek_client()
+        self.context_builder = ContextBuilder(self.knowledge_base, settings.CHATBOT_CONTEXT_TOKEN_BUDGET)
+        self.answer_cache = get_answer_cache()
+        self.semantic_cache = get_semantic_cache()
 
     def get_response(self, user_query):
         """Main RAG method: Retrieve relevant information and generate response"""
@@ -203,127 +69,63 @@ class RAGService:
         
         # Find relevant fish species
         relevant_fish = self._find_relevant_fish(query_lower)
+        # Without a species name, look for passages and species relevant to the query
+        passages, top_species = ([], []) if relevant_fish else self._search_passages(query_lower)
+        query_intent = self._analyze_query_intent(query_lower)
         
         # Extract specific information based on query intent
         retrieved_data = {
             "relevant_fish": relevant_fish,
-            "query_intent": self._analyze_query_intent(query_lower),
-            "context": self._build_context(relevant_fish, query_lower)
+            "passages": passages,
+            "top_species": top_species,
+            "query_intent": query_intent,
+            "context": self._build_context(relevant_fish, query_intent, passages, top_species)
         }
         
         return retrieved_data
 
     def _find_relevant_fish(self, query):
-        """Find fish species relevant to the query"""
-        relevant_fish = []
-        
-        # Check for scientific names
-        for key, info in self.fish_species_mapping.items():
-            if info['scientific'].lower() in query:
-                relevant_fish.append((key, info, "scientific"))
-        
-        # Check for vernacular names
-        for key, info in self.fish_species_mapping.items():
-            vernacular = info['vernacular'].lower()
-            if vernacular in query or any(part in query for part in vernacular.split()):
-                relevant_fish.append((key, info, "vernacular"))
-        
-        # Check for common names
-        for key, info in self.fish_species_mapping.items():
-            common = info['common'].lower()
-            if common in query or any(part in query for part in common.split(',')):
-                relevant_fish.append((key, info, "common"))
-        
-        # Check for specific known variations
-        variations = {
-            "bulath hapaya": "pethia_nigrofasciata",
-            "bulath": "pethia_nigrofasciata",
-            "hapaya": "pethia_nigrofasciata",
-            "depulliya": "pethia_cumingii",
-            "two spot": "pethia_cumingii",
-            "cuming": "pethia_cumingii",
-            "cherry barb": "puntius_titteya",
-            "titteya": "puntius_titteya",
-            "barred danio": "devario_pathirana",
-            "pathirana": "devario_pathirana",
-            "combtail": "belontia_signata",
-            "thal kossa": "belontia_signata",
-            "thalkossa": "belontia_signata",
-            "blotched": "dawkinsia_srilankensis",
-            "filamented": "dawkinsia_srilankensis",
-            "mal pethiya": "dawkinsia_srilankensis"
-        }
-        
-        for variation, key in variations.items():
-            if variation in query and key in self.fish_species_mapping:
-                relevant_fish.append((key, self.fish_species_mapping[key], "variation"))
-        
-        return relevant_fish
+        """Find fish species relevant to the query, in order of first mention"""
+        return [
+            (key, self.fish_species_mapping[key], match_type)
+            for key, match_type in self.knowledge_base.species_matcher.species(query)
+        ]
+
+    def _search_passages(self, query):
+        """Ontology passages relevant to the query and the species they rank highest
+
+        Returns ([(fish_key, fish_info, field, text)], [(fish_key, fish_info)]),
+        both best first.
+        """
+        hits = self.knowledge_base.search_passages(
+            query, settings.CHATBOT_PASSAGE_TOP_K,
+            settings.CHATBOT_RETRIEVAL, settings.CHATBOT_HYBRID_DENSE_WEIGHT,
+            settings.CHATBOT_DENSE_MIN_SCORE
+        )
+        passages = [(key, self.fish_species_mapping[key], field, text) for _, key, field, text in hits]
+        top_species = [
+            (key, self.fish_species_mapping[key])
+            for key, _ in rank_species(hits, settings.CHATBOT_SPECIES_TOP_K)
+        ]
+        return passages, top_species
 
     def _analyze_query_intent(self, query):
         """Analyze what type of information the user is asking for"""
-        intent_keywords = {
-            "habitat": ["habitat", "where", "live", "environment", "water", "stream", "river"],
-            "conservation": ["conservation", "threat", "endangered", "vulnerable", "status", "iucn"],
-            "appearance": ["appearance", "look", "color", "size", "morphology", "shape", "body"],
-            "behavior": ["behavior", "behaviour", "ecology", "feeding", "diet", "reproduction"],
-            "distribution": ["distribution", "location", "found", "range", "basin", "district"],
-            "aquarium": ["aquarium", "tank", "captive", "breeding", "care", "maintenance"],
-            "general": ["tell me", "about", "information", "what is", "describe"]
-        }
-        
-        for intent, keywords in intent_keywords.items():
+        for intent, keywords in INTENT_KEYWORDS.items():
             if any(keyword in query for keyword in keywords):
                 return intent
         
         return "general"
 
-    def _build_context(self, relevant_fish, query):
-        """Build comprehensive context from relevant fish data"""
+    def _build_context(self, relevant_fish, query_intent, passages=(), top_species=()):
+        """Build the intent's fields of the relevant fish into a token-budgeted context"""
+        if not relevant_fish and passages:
+            return self.context_builder.passage_context(passages, top_species)
         if not relevant_fish:
             return "No specific fish species mentioned in the query."
-        
-        context_parts = []
-        
-        for fish_key, fish_info, match_type in relevant_fish:
-            fish_context = f"""
-Fish Species: {fish_info['vernacular']} ({fish_info['scientific']})
-Common Name: {fish_info['common']}
-Family: {fish_info['family']}
-Order: {fish_info['order']}
-IUCN Status: {fish_info['iucn_status']}
-Maximum Length: {fish_info['max_length']}
-Habitat: {fish_info['habitat']}
-Description: {fish_info['description']}
-"""
-            
-            # Add specific information based on query intent
-            if fish_info.get('morphology'):
-                fish_context += f"Morphology: {fish_info['morphology']}\n"
-            if fish_info.get('ecology'):
-                fish_context += f"Ecology & Behavior: {fish_info['ecology']}\n"
-            if fish_info.get('diet'):
-                fish_context += f"Diet: {fish_info['diet']}\n"
-            if fish_info.get('distribution'):
-                fish_context += f"Distribution: {fish_info['distribution']}\n"
-            if fish_info.get('specific_location'):
-                fish_context += f"Specific Locations: {fish_info['specific_location']}\n"
-            if fish_info.get('status_notes'):
-                fish_context += f"Conservation Notes: {fish_info['status_notes']}\n"
-            if fish_info.get('colour_variants'):
-                fish_context += f"Color Variants: {fish_info['colour_variants']}\n"
-            if fish_info.get('temperature_range'):
-                fish_context += f"Temperature Range: {fish_info['temperature_range']}\n"
-            if fish_info.get('ph_range'):
-                fish_context += f"pH Range: {fish_info['ph_range']}\n"
-            if fish_info.get('aquarium_group_size'):
-                fish_context += f"Aquarium Group Size: {fish_info['aquarium_group_size']}\n"
-            if fish_info.get('aquarium_tank_size'):
-                fish_context += f"Aquarium Tank Size: {fish_info['aquarium_tank_size']}\n"
-            
-            context_parts.append(fish_context)
-        
-        return "\n".join(context_parts)
+        return self.context_builder.species_context(
+            [fish_key for fish_key, fish_info, match_type in relevant_fish], query_intent
+        )
 
     def _generate_response(self, user_query, retrieved_data):
         """Generate response using DeepSeek LLM with retrieved context"""
@@ -331,58 +133,179 @@ Description: {fish_info['description']}
             return self._fallback_response(user_query, retrieved_data)
         
         try:
-            # Build system prompt
-            system_prompt = """You are an expert ichthyologist specializing in Sri Lankan endemic freshwater fish species. 
-            You have access to comprehensive information about 6 endemic fish species from an OWL ontology.
-            
-            IMPORTANT INSTRUCTIONS:
-            1. Keep responses CONCISE and DIRECT - answer only what was asked
-            2. Avoid lengthy introductions or overviews unless specifically requested
-            3. For simple greetings like "hi", give a brief welcome and ask what they want to know
-            4. For specific questions, provide focused answers without extra background information
-            5. Use bullet points and clear formatting for easy reading
-            6. Be conversational but brief
-            
-            Examples:
-            - "hi" → "Hello! What would you like to know about Sri Lankan fish?"
-            - "habitat of bulath hapaya" → Direct habitat information only
-            - "girlfriend of bulath hapaya" → Explain it's the female of the species, no extra details
-            
-            Always base your responses on the provided context data."""
-            
-            # Build user prompt with context
-            user_prompt = f"""
-            Context Information:
-            {retrieved_data['context']}
-            
-            User Query: {user_query}
-            
-            Provide a CONCISE response that directly answers the user's question. 
-            - Keep it brief and to the point
-            - Use bullet points for easy reading
-            - Only include information relevant to the specific question asked
-            - Avoid lengthy introductions or extra background information
-            """
-            
-            # Call DeepSeek API
-            response = self.client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
+            # Near-duplicate questions with the same species, intent and context share an answer
+            signature = None
+            if self.semantic_cache is not None:
+                signature = self._semantic_signature(user_query, retrieved_data)
+                answer = self.semantic_cache.get(signature)
+                if answer is not None:
+                    return answer
+
+            if self.answer_cache is None:
+                answer, cacheable = self._complete(user_query, retrieved_data)
+            else:
+                answer, status = self.answer_cache.get_or_compute(
+                    self._answer_key(user_query, retrieved_data),
+                    lambda: self._complete(user_query, retrieved_data)
+                )
+                cacheable = status != 'uncached'
+            if signature is not None and cacheable:
+                self.semantic_cache.put(signature, answer)
+            return answer
             
         except Exception as e:
             print(f"Error calling DeepSeek API: {e}")
             return self._fallback_response(user_query, retrieved_data)
 
+    def stream_response(self, user_query):
+        """Like get_response, but yields the answer in pieces as the LLM generates it
+
+        Cached and fallback answers come as a single piece. Only a stream
+        that completes is stored in the answer caches.
+        """
+        try:
+            retrieved_data = self._retrieve_information(user_query)
+        except Exception as e:
+            print(f"Error in RAG service: {e}")
+            yield f"I'm sorry, I encountered an error while processing your query: {str(e)}"
+            return
+        if not self.client:
+            yield self._fallback_response(user_query, retrieved_data)
+            return
+
+        pieces = []
+        try:
+            signature = None
+            if self.semantic_cache is not None:
+                signature = self._semantic_signature(user_query, retrieved_data)
+                answer = self.semantic_cache.get(signature)
+                if answer is not None:
+                    yield answer
+                    return
+
+            key = None
+            answer = None
+            if self.answer_cache is not None:
+                key = self._answer_key(user_query, retrieved_data)
+                answer, _ = self.answer_cache.get(key, lambda: self._complete(user_query, retrieved_data))
+            cacheable = True
+            if answer is None:
+                finish_reason = yield from self._complete_stream(user_query, retrieved_data, pieces)
+                answer = "".join(pieces)
+                cacheable = finish_reason != 'length'
+                if key is not None and cacheable:
+                    self.answer_cache.set(key, answer)
+            else:
+                yield answer
+            if signature is not None and cacheable:
+                self.semantic_cache.put(signature, answer)
+
+        except Exception as e:
+            print(f"Error streaming from DeepSeek API: {e}")
+            if pieces:
+                yield "\n\n*The answer was interrupted, please ask again.*"
+            else:
+                yield self._fallback_response(user_query, retrieved_data)
+
+    def _answer_key(self, user_query, retrieved_data):
+        return answer_key(user_query, retrieved_data['context'], f"{DEEPSEEK_MODEL}/prompt-{PROMPT_VERSION}")
+
+    def _semantic_signature(self, user_query, retrieved_data):
+        words = residual_words(user_query, self.knowledge_base.species_matcher, INTENT_WORDS)
+        return self.semantic_cache.signature(
+            [fish_key for fish_key, fish_info, match_type in retrieved_data['relevant_fish']],
+            retrieved_data['query_intent'],
+            f"{DEEPSEEK_MODEL}/prompt-{PROMPT_VERSION}\n{retrieved_data['context']}",
+            words
+        )
+
+    def _completion_args(self, user_query, retrieved_data):
+        """Keyword arguments of the DeepSeek chat completion answering the query"""
+        # Build system prompt
+        system_prompt = """You are an expert ichthyologist specializing in Sri Lankan endemic freshwater fish species. 
+        You have access to comprehensive information about 6 endemic fish species from an OWL ontology.
+        
+        IMPORTANT INSTRUCTIONS:
+        1. Keep responses CONCISE and DIRECT - answer only what was asked
+        2. Avoid lengthy introductions or overviews unless specifically requested
+        3. For simple greetings like "hi", give a brief welcome and ask what they want to know
+        4. For specific questions, provide focused answers without extra background information
+        5. Use bullet points and clear formatting for easy reading
+        6. Be conversational but brief
+        
+        Examples:
+        - "hi" → "Hello! What would you like to know about Sri Lankan fish?"
+        - "habitat of bulath hapaya" → Direct habitat information only
+        - "girlfriend of bulath hapaya" → Explain it's the female of the species, no extra details
+        
+        Always base your responses on the provided context data."""
+        
+        # Build user prompt with context
+        user_prompt = f"""
+        Context Information:
+        {retrieved_data['context']}
+        
+        User Query: {user_query}
+        
+        Provide a CONCISE response that directly answers the user's question. 
+        - Keep it brief and to the point
+        - Use bullet points for easy reading
+        - Only include information relevant to the specific question asked
+        - Avoid lengthy introductions or extra background information
+        """
+        
+        return dict(
+            model=DEEPSEEK_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            max_tokens=response_max_tokens(
+                retrieved_data['query_intent'], len(retrieved_data['relevant_fish']),
+                settings.CHATBOT_MAX_RESPONSE_TOKENS
+            ),
+            temperature=0.7
+        )
+
+    def _complete(self, user_query, retrieved_data):
+        """Ask DeepSeek to answer the query from the retrieved context; API errors propagate
+
+        Returns (answer, cacheable): an answer cut off at max_tokens is
+        returned but must not be cached.
+        """
+        response = self.client.chat.completions.create(**self._completion_args(user_query, retrieved_data))
+        choice = response.choices[0]
+        return choice.message.content, choice.finish_reason != 'length'
+
+    def _complete_stream(self, user_query, retrieved_data, pieces):
+        """Like _complete, but yields the answer piece by piece as DeepSeek generates it
+
+        Each piece is also appended to pieces; the generator returns the
+        finish reason of the completion.
+        """
+        stream = self.client.chat.completions.create(
+            **self._completion_args(user_query, retrieved_data), stream=True
+        )
+        finish_reason = None
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta.content:
+                pieces.append(choice.delta.content)
+                yield choice.delta.content
+            finish_reason = choice.finish_reason or finish_reason
+        return finish_reason
+
     def _fallback_response(self, user_query, retrieved_data):
         """Fallback response when DeepSeek API is not available"""
+        if not retrieved_data['relevant_fish'] and retrieved_data.get('passages'):
+            response_parts = []
+            for fish_key, fish_info, field, text in retrieved_data['passages']:
+                label = field.replace('_', ' ').capitalize()
+                response_parts.append(f"- **{fish_info['vernacular']}** ({fish_info['scientific']}) - {label}: {text}")
+            names = ", ".join(f"**{fish_info['vernacular']}**" for fish_key, fish_info in retrieved_data['top_species'])
+            return f"These species match your question: {names}\n\n" + "\n".join(response_parts)
         if not retrieved_data['relevant_fish']:
             return "Hello! What would you like to know about Sri Lankan fish?"
         
@@ -0,0 +1,175 @@
+"""
+Semantic cache of chat answers for near-duplicate questions
+A question is reduced to its species, its intent, the hash of its retrieved
+context and a vector of the words left once species names, intent keywords
+and stopwords are removed. A cached answer is reused when the first three
+match exactly and the residual vectors are similar enough: "where does
+depulliya live" and "depulliya habitat?" both leave nothing behind.
+
+Entries are grouped by (species, intent, context hash), so a lookup is one
+dict access plus a dot product over the few entries of that group, however
+large the cache grows
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from django.conf import settings
+from .keyword_index import STOPWORDS
+from .dense_index import HashedNgramEmbedder
+from .species_matcher import tokenize
+
+
+# Question words change what is asked ("why is X endangered" is not "is X
+# endangered"), so unlike BM25 the residual keeps them even when they are also
+# intent keywords; "where" is left out as it only restates the habitat intent
+QUESTION_WORDS = frozenset(("how", "what", "when", "which", "who", "why"))
+RESIDUAL_STOPWORDS = STOPWORDS - QUESTION_WORDS
+
+
+def residual_words(query, species_matcher, ignored_words):
+    """Words of a query that are not species names, ignored words or stopwords (question words are kept)"""
+    tokens = tokenize(query)
+    mentioned = set()
+    for start, end, _, _ in species_matcher.find_all(query):
+        mentioned.update(range(start, end))
+    return [
+        token for i, token in enumerate(tokens)
+        if i not in mentioned and token.isalnum()
+        and (token in QUESTION_WORDS or (token not in ignored_words and token not in RESIDUAL_STOPWORDS))
+    ]
+
+
+class _Group:
+    """Residual vectors and answers of the questions sharing one (species, intent, context)"""
+
+    def __init__(self, dimensions, capacity):
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.answers = [None] * capacity
+        self.expires = np.zeros(capacity, dtype=np.float64)
+        self.size = 0
+        self.next = 0
+
+    def best(self, vector, now):
+        """(similarity, slot) of the closest unexpired entry, or (0.0, None)"""
+        if not self.size:
+            return 0.0, None
+        similarities = self.vectors[:self.size] @ vector
+        similarities[self.expires[:self.size] <= now] = -1
+        slot = int(np.argmax(similarities))
+        return float(similarities[slot]), (slot if similarities[slot] >= 0 else None)
+
+    def add(self, vector, answer, expires):
+        # Once full, the oldest entry is overwritten
+        slot = self.next
+        self.vectors[slot] = vector
+        self.answers[slot] = answer
+        self.expires[slot] = expires
+        self.next = (slot + 1) % len(self.answers)
+        added = self.size < len(self.answers)
+        self.size = min(self.size + 1, len(self.answers))
+        return added
+
+
+class SemanticCache:
+    """Answers keyed by (species, intent, context hash) and a residual word vector
+
+    A lookup hits when a cached question of the same group has a residual
+    vector with cosine similarity of at least threshold. Groups are evicted
+    least recently used first once the cache holds max_entries answers.
+    """
+
+    def __init__(self, threshold=0.9, max_entries=4096, ttl=86400, group_size=32, dimensions=256):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.group_size = group_size
+        # residual_words has already dropped stopwords, keeping question words
+        self.embedder = HashedNgramEmbedder(dimensions=dimensions, buckets=1 << 16, stopwords=frozenset())
+        # Residual words are compared as they are, without corpus weighting
+        self._idf = np.ones(self.embedder.buckets, dtype=np.float32)
+        self._groups = OrderedDict()
+        self._entries = 0
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "stores": 0}
+
+    def signature(self, species_keys, intent, context, words):
+        """(group key, residual vector) of a question"""
+        context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()
+        group = (tuple(species_keys), intent, context_hash)
+        # The last dimension marks an empty residual, so two empty residuals
+        # have similarity 1 and an empty and a non-empty one 0
+        vector = np.zeros(self.embedder.dimensions + 1, dtype=np.float32)
+        if words:
+            vector[:-1] = self.embedder.embed(" ".join(words), self._idf)
+        if not vector.any():
+            vector[-1] = 1.0
+        return group, vector
+
+    def get(self, signature):
+        """The cached answer for a near-duplicate question, or None"""
+        group_key, vector = signature
+        now = time.time()
+        with self._lock:
+            group = self._groups.get(group_key)
+            if group is not None:
+                similarity, slot = group.best(vector, now)
+                if slot is not None and similarity >= self.threshold:
+                    self._groups.move_to_end(group_key)
+                    self._counts["hits"] += 1
+                    return group.answers[slot]
+            self._counts["misses"] += 1
+            return None
+
+    def put(self, signature, answer):
+        group_key, vector = signature
+        now = time.time()
+        with self._lock:
+            group = self._groups.get(group_key)
+            if group is None:
+                group = self._groups[group_key] = _Group(len(vector), self.group_size)
+            else:
+                self._groups.move_to_end(group_key)
+                similarity, slot = group.best(vector, now)
+                if slot is not None and similarity >= self.threshold:
+                    # Already answerable from the cache
+                    return
+            if group.add(vector, answer, now + self.ttl):
+                self._entries += 1
+            self._counts["stores"] += 1
+            while self._entries > self.max_entries and len(self._groups) > 1:
+                _, evicted = self._groups.popitem(last=False)
+                self._entries -= evicted.size
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            groups = len(self._groups)
+            entries = self._entries
+        lookups = counts["hits"] + counts["misses"]
+        return {
+            **counts,
+            "lookups": lookups,
+            "hit_rate": round(counts["hits"] / lookups, 4) if lookups else None,
+            "entries": entries,
+            "groups": groups,
+        }
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """The process-wide SemanticCache, or None when it or answer caching is disabled"""
+    global _semantic_cache
+    if _semantic_cache is None and settings.CHATBOT_SEMANTIC_CACHE_SIZE > 0 and settings.CHATBOT_ANSWER_CACHE_TTL > 0:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache(
+                    settings.CHATBOT_SEMANTIC_CACHE_THRESHOLD,
+                    settings.CHATBOT_SEMANTIC_CACHE_SIZE,
+                    settings.CHATBOT_ANSWER_CACHE_TTL,
+                )
+    return _semantic_cache
@@ -2,6 +2,7 @@
 Simple chatbot service that provides fish information without complex ontology queries
 """
 from .models import FishSpecies
+from .knowledge_base import get_knowledge_base
 
 class SimpleChatbotService:
     def __init__(self):
@@ -79,6 +80,8 @@ class SimpleChatbotService:
                 "description": "Compressed body with three black vertical bands"
             }
         }
+        # Shared species name matcher from the knowledge base
+        self.species_matcher = get_knowledge_base().species_matcher
 
     def get_response(self, user_query):
         """Get chatbot response for user query"""
@@ -98,48 +101,8 @@ class SimpleChatbotService:
 
     def _find_fish_in_query(self, query):
         """Find which fish species is mentioned in the query"""
-        # Check for scientific names
-        for key, info in self.fish_species_mapping.items():
-            if info['scientific'].lower() in query:
-                return key
-        
-        # Check for vernacular names (including partial matches)
-        for key, info in self.fish_species_mapping.items():
-            vernacular = info['vernacular'].lower()
-            if vernacular in query or any(part in query for part in vernacular.split()):
-                return key
-        
-        # Check for common names (including partial matches)
-        for key, info in self.fish_species_mapping.items():
-            common = info['common'].lower()
-            if common in query or any(part in query for part in common.split(',')):
-                return key
-        
-        # Check for specific known variations
-        variations = {
-            "bulath hapaya": "pethia_nigrofasciata",
-            "bulath": "pethia_nigrofasciata",
-            "hapaya": "pethia_nigrofasciata",
-            "depulliya": "pethia_cumingii",
-            "two spot": "pethia_cumingii",
-            "cuming": "pethia_cumingii",
-            "cherry barb": "puntius_titteya",
-            "titteya": "puntius_titteya",
-            "barred danio": "devario_pathirana",
-            "pathirana": "devario_pathirana",
-            "combtail": "belontia_signata",
-            "thal kossa": "belontia_signata",
-            "thalkossa": "belontia_signata",
-            "blotched": "dawkinsia_srilankensis",
-            "filamented": "dawkinsia_srilankensis",
-            "mal pethiya": "dawkinsia_srilankensis"
-        }
-        
-        for variation, key in variations.items():
-            if variation in query:
-                return key
-        
-        return None
+        key = self.species_matcher.best_species(query)
+        return key if key in self.fish_species_mapping else None
 
     def _get_fish_information(self, fish_name, user_query):
         """Get fish information from database"""
@@ -0,0 +1,134 @@
+"""
+Species mention matching
+All scientific, vernacular and common names plus known aliases are compiled
+into one Aho-Corasick automaton over word tokens, so every mention in a query
+is found in a single pass over it and only whole words ever match
+"""
+import re
+from collections import deque
+
+# Match types in priority order, used when a single species has to be picked
+MATCH_TYPES = ('scientific', 'vernacular', 'common', 'variation')
+
+# Known alternative names and spellings -> species key
+SPECIES_ALIASES = {
+    "bulath hapaya": "pethia_nigrofasciata",
+    "bulath": "pethia_nigrofasciata",
+    "hapaya": "pethia_nigrofasciata",
+    "depulliya": "pethia_cumingii",
+    "two spot": "pethia_cumingii",
+    "cuming": "pethia_cumingii",
+    "cherry barb": "puntius_titteya",
+    "titteya": "puntius_titteya",
+    "barred danio": "devario_pathirana",
+    "pathirana": "devario_pathirana",
+    "combtail": "belontia_signata",
+    "thal kossa": "belontia_signata",
+    "thalkossa": "belontia_signata",
+    "blotched": "dawkinsia_srilankensis",
+    "filamented": "dawkinsia_srilankensis",
+    "mal pethiya": "dawkinsia_srilankensis",
+}
+
+# Separators between alternative names in a single ontology field,
+# e.g. "Bulath Hapaya / Manamaalaya" or "Cuming's Barb, Two spot barb"
+NAME_SEPARATORS = re.compile(r'[/,;]')
+
+
+# Words (runs of letters and digits) and single punctuation characters
+TOKEN = re.compile(r"[^\W_]+|[^\w\s]|_")
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def species_names(fish_species_mapping):
+    """(name, species key, match type) for every name of every species, plus the known aliases"""
+    names = []
+    for key, info in fish_species_mapping.items():
+        names.append((info['scientific'], key, 'scientific'))
+        for match_type, field in (('vernacular', 'vernacular'), ('common', 'common')):
+            names.append((info[field], key, match_type))
+            names.extend((part, key, match_type) for part in NAME_SEPARATORS.split(info[field]))
+    for alias, key in SPECIES_ALIASES.items():
+        if key in fish_species_mapping:
+            names.append((alias, key, 'variation'))
+    return names
+
+
+class SpeciesMatcher:
+    """Aho-Corasick automaton over species names"""
+
+    def __init__(self, names):
+        # Trie over tokens: per-node transitions, failure links and (length, key, match type) outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._outputs = [[]]
+        seen = set()
+        for name, key, match_type in names:
+            pattern = tuple(tokenize(name))
+            # Names without a word (e.g. a stray "/") would match any punctuation
+            if not any(token.isalnum() for token in pattern) or (pattern, key, match_type) in seen:
+                continue
+            seen.add((pattern, key, match_type))
+            self._add(pattern, key, match_type)
+        self._build_failure_links()
+
+    def _add(self, pattern, key, match_type):
+        node = 0
+        for token in pattern:
+            if token not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._goto[node][token] = len(self._goto) - 1
+            node = self._goto[node][token]
+        self._outputs[node].append((len(pattern), key, match_type))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(token, 0)
+                # Inherit the outputs of the longest proper suffix that is also a pattern
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+
+    def find_all(self, text):
+        """Every name mention in text as (start token, end token, species key, match type)"""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        matches = []
+        node = 0
+        for end, token in enumerate(tokenize(text), 1):
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            for length, key, match_type in outputs[node]:
+                matches.append((end - length, end, key, match_type))
+        matches.sort()
+        return matches
+
+    def species(self, text):
+        """[(species key, match type)] for each species mentioned, in order of first mention
+
+        The match type is the highest priority one found for that species.
+        """
+        found = {}
+        for _, _, key, match_type in self.find_all(text):
+            if key not in found or MATCH_TYPES.index(match_type) < MATCH_TYPES.index(found[key]):
+                found[key] = match_type
+        return list(found.items())
+
+    def best_species(self, text):
+        """The single species key mentioned with the highest priority match type, or None"""
+        best = None
+        for start, _, key, match_type in self.find_all(text):
+            rank = (MATCH_TYPES.index(match_type), start)
+            if best is None or rank < best[0]:
+                best = (rank, key)
+        return best[1] if best else None
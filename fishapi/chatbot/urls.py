@@ -4,6 +4,8 @@ from . import views
 urlpatterns = [
     path('chat/', views.chat_view, name='chat'),
     path('api/chat/', views.chat_api, name='chat_api'),
+    path('api/chat/stream/', views.chat_stream, name='chat_stream'),
+    path('api/chat/cache/stats/', views.answer_cache_stats, name='answer_cache_stats'),
     path('api/species/', views.species_list, name='species_list'),
     path('api/species/<int:species_id>/', views.species_detail, name='species_detail'),
 ]
@@ -1,8 +1,11 @@
 import os
 import json
+import time
 import uuid
 from django.shortcuts import render
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.conf import settings
@@ -14,6 +17,51 @@ from .chatbot_service import ChatbotService
 from .ontology_service import OntologyService
 from .simple_chatbot_service import SimpleChatbotService
 from .rag_service import RAGService
+from .answer_cache import get_answer_cache
+from .semantic_cache import get_semantic_cache
+
+# Shared by all requests; it only reads the process-wide knowledge base
+rag_service = None
+
+
+def get_rag_service():
+    global rag_service
+    if rag_service is None:
+        rag_service = RAGService()
+    return rag_service
+
+
+def get_or_create_session(session_id):
+    if session_id:
+        try:
+            return ChatSession.objects.get(session_id=session_id)
+        except ChatSession.DoesNotExist:
+            return ChatSession.objects.create(session_id=session_id)
+    return ChatSession.objects.create(session_id=str(uuid.uuid4()))
+
+
+def sse_event(data, event=None):
+    """One Server-Sent Events frame carrying data as JSON"""
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {json.dumps(data)}\n\n"
+
+
+async def iterate_in_thread(iterator):
+    """Async iterator over a sync one, each step run off the event loop
+
+    Under ASGI, Django reads a sync iterator passed to StreamingHttpResponse
+    to the end before sending anything; this keeps the response streaming.
+    The sync iterator is closed if the client goes away.
+    """
+    done = object()
+    try:
+        while True:
+            item = await sync_to_async(next)(iterator, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        await sync_to_async(iterator.close)()
 
 
 def chat_view(request):
@@ -75,6 +123,8 @@ def chat_api(request):
     try:
         print(f"Chat API called with data: {request.data}")
         data = request.data
+        if not isinstance(data, dict):
+            return Response({'error': 'Expected a JSON object'}, status=400)
         message = data.get('message', '')
         session_id = data.get('session_id')
         
@@ -82,13 +132,7 @@ def chat_api(request):
             return Response({'error': 'Message is required'}, status=400)
         
         # Get or create session
-        if session_id:
-            try:
-                session = ChatSession.objects.get(session_id=session_id)
-            except ChatSession.DoesNotExist:
-                session = ChatSession.objects.create(session_id=session_id)
-        else:
-            session = ChatSession.objects.create(session_id=str(uuid.uuid4()))
+        session = get_or_create_session(session_id)
         
         # Save user message
         ChatMessage.objects.create(
@@ -98,8 +142,7 @@ def chat_api(request):
         )
         
         # Get chatbot response using RAG service
-        rag_service = RAGService()
-        response = rag_service.get_response(message)
+        response = get_rag_service().get_response(message)
         
         # Save assistant response
         ChatMessage.objects.create(
@@ -115,3 +158,71 @@ def chat_api(request):
         
     except Exception as e:
         return Response({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+@require_http_methods(['POST'])
+def chat_stream(request):
+    """Chat API that streams the answer as Server-Sent Events while the LLM generates it
+
+    Emits a 'session' event, then unnamed events with {"token": ...} pieces,
+    then 'done' with the timings (or 'error'). The full answer is saved as
+    one ChatMessage once the stream ends.
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'error': 'Expected a JSON object'}, status=400)
+    message = data.get('message', '')
+    if not message:
+        return JsonResponse({'error': 'Message is required'}, status=400)
+
+    session = get_or_create_session(data.get('session_id'))
+    ChatMessage.objects.create(session=session, role='user', content=message)
+
+    def events():
+        start = time.perf_counter()
+        first_token_ms = None
+        pieces = []
+        try:
+            yield sse_event({'session_id': session.session_id}, 'session')
+            for piece in get_rag_service().stream_response(message):
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                pieces.append(piece)
+                yield sse_event({'token': piece})
+            yield sse_event({
+                'session_id': session.session_id,
+                'ttft_ms': round(first_token_ms or 0, 1),
+                'total_ms': round((time.perf_counter() - start) * 1000, 1),
+            }, 'done')
+        except Exception as e:
+            print(f"Error streaming chat response: {e}")
+            yield sse_event({'error': str(e)}, 'error')
+        finally:
+            # Runs on client disconnect too, keeping whatever was generated
+            if pieces:
+                ChatMessage.objects.create(session=session, role='assistant', content="".join(pieces))
+
+    stream = iterate_in_thread(events()) if isinstance(request, ASGIRequest) else events()
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+def answer_cache_stats(request):
+    """Hit and miss counts of this process's LLM answer caches"""
+    answer_cache = get_answer_cache()
+    if answer_cache is None:
+        return Response({'enabled': False})
+    semantic_cache = get_semantic_cache()
+    return Response({
+        'enabled': True,
+        **answer_cache.stats(),
+        'semantic': semantic_cache.stats() if semantic_cache is not None else {'enabled': False},
+    })
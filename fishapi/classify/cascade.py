@@ -0,0 +1,140 @@
+"""
+Confidence-gated model cascade
+A small, fast model answers first; the full model only runs when the fast
+model's top-1 confidence is below a threshold
+"""
+import json
+import os
+import random
+import threading
+import time
+import numpy as np
+import tensorflow as tf
+from keras.models import load_model
+
+
+class TFLiteModel:
+    """Callable wrapper around a TFLite model with one interpreter per thread"""
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self._local = threading.local()
+        # Fail early if the file is missing or invalid
+        self._interpreter()
+
+    def _interpreter(self):
+        if not hasattr(self._local, 'interpreter'):
+            interpreter = tf.lite.Interpreter(model_path=self.model_path)
+            interpreter.allocate_tensors()
+            self._local.interpreter = interpreter
+            self._local.batch_size = interpreter.get_input_details()[0]['shape'][0]
+        return self._local.interpreter
+
+    def __call__(self, batch, training=False):
+        interpreter = self._interpreter()
+        input_index = interpreter.get_input_details()[0]['index']
+        if self._local.batch_size != len(batch):
+            interpreter.resize_tensor_input(input_index, batch.shape)
+            interpreter.allocate_tensors()
+            self._local.batch_size = len(batch)
+        interpreter.set_tensor(input_index, batch)
+        interpreter.invoke()
+        return interpreter.get_tensor(interpreter.get_output_details()[0]['index'])
+
+
+def load_fast_model(model_path):
+    """Load the cascade's first-stage model (.tflite, or any Keras model file)"""
+    if model_path.endswith('.tflite'):
+        return TFLiteModel(model_path)
+    keras_model = load_model(model_path)
+    return lambda batch, training=False: np.asarray(keras_model(batch, training=False))
+
+
+class CascadeClassifier:
+    """Two-stage classifier that escalates low-confidence images to the full model
+
+    A fraction (audit_rate) of the images resolved by the fast model is also
+    run through the full model in the background so both outputs can be
+    compared when tuning the threshold. Every decision is appended to the
+    JSONL log at log_path, when set.
+    """
+
+    def __init__(self, fast_predict, full_predict, threshold, audit_rate=0.0, log_path=None, executor=None):
+        self.fast_predict = fast_predict
+        self.full_predict = full_predict
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.log_path = log_path
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+        self.executor = executor
+        self._lock = threading.Lock()
+        self._counts = {"fast": 0, "full": 0, "audited": 0}
+
+    def predict(self, batch):
+        """Predict a single-image batch, returning (probabilities, stage)"""
+        fast = np.asarray(self.fast_predict(batch))[0]
+        if float(np.max(fast)) >= self.threshold:
+            self._count("fast")
+            if self.audit_rate and random.random() < self.audit_rate:
+                self._audit(batch, fast)
+            else:
+                self._log(fast, None, "fast")
+            return fast, "fast"
+
+        full = np.asarray(self.full_predict(batch))[0]
+        self._count("full")
+        self._log(fast, full, "full")
+        return full, "full"
+
+    def _audit(self, batch, fast):
+        # The batch buffer is reused by later requests, so audit a copy
+        batch = batch.copy()
+
+        def run():
+            full = np.asarray(self.full_predict(batch))[0]
+            self._count("audited")
+            self._log(fast, full, "fast")
+
+        if self.executor is not None:
+            self.executor.submit(run)
+        else:
+            run()
+
+    def _count(self, key):
+        with self._lock:
+            self._counts[key] += 1
+
+    def _log(self, fast, full, stage):
+        if not self.log_path:
+            return
+        record = {
+            "time": time.time(),
+            "stage": stage,
+            "threshold": self.threshold,
+            "fast": [round(float(p), 5) for p in fast],
+            "full": [round(float(p), 5) for p in full] if full is not None else None,
+        }
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            with open(self.log_path, 'a') as f:
+                f.write(line)
+
+    def stats(self):
+        """Request counts and the fraction resolved by each stage"""
+        with self._lock:
+            counts = dict(self._counts)
+        total = counts["fast"] + counts["full"]
+        return {
+            "threshold": self.threshold,
+            "requests": total,
+            "resolved_by_fast": counts["fast"],
+            "resolved_by_full": counts["full"],
+            "fast_fraction": round(counts["fast"] / total, 4) if total else None,
+            "full_fraction": round(counts["full"] / total, 4) if total else None,
+            "audited": counts["audited"],
+        }
+
+
+def cascade_enabled(model_path):
+    return bool(model_path) and os.path.exists(model_path)
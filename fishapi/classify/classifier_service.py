@@ -0,0 +1,250 @@
+"""
+Classifier model service
+Owns the Keras model and everything that needs TensorFlow or OpenCV, so
+those libraries are only imported by processes that actually classify
+"""
+from keras.models import load_model, clone_model
+import numpy as np
+import tensorflow as tf
+import cv2
+import os
+import threading
+import uuid
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from chatbot.knowledge_base import get_knowledge_base
+from .species import class_names, build_species_table
+from .saliency import composite_heatmap, overlay_heatmap, encode_saliency, RAW_SALIENCY_SIZE, RAW_SALIENCY_DTYPES
+from .preprocessing import open_upload, get_tile_buffer, tiles_into
+from .inference_pool import InferencePool
+from .stages import get_executor
+from .explanations import explain, EXPLANATION_METHODS
+from .cascade import CascadeClassifier, load_fast_model, cascade_enabled
+from .embeddings import ReferenceIndex, build_feature_extractor, embed
+from .tiling import tile_boxes, merge_tiles, unreachable_scales
+
+# Model will be loaded lazily to handle compatibility issues
+model = None
+model_path = os.path.join(os.path.dirname(__file__), 'best_fish_classifier.h5')
+
+# Class index -> fish_info, resolved alongside the model
+species_table = None
+_model_lock = threading.Lock()
+
+def get_model():
+    global model, species_table
+    if model is None:
+        with _model_lock:
+            if species_table is None:
+                species_table = build_species_table(class_names, get_knowledge_base().fish_species_mapping)
+            if model is None:
+                try:
+                    loaded = load_model(model_path)
+                except Exception as e:
+                    print(f"Error loading model: {e}")
+                    # Create a dummy model for testing
+                    from keras.models import Sequential
+                    from keras.layers import Dense, GlobalAveragePooling2D
+                    loaded = Sequential([
+                        GlobalAveragePooling2D(input_shape=(224, 224, 3)),
+                        Dense(7, activation='softmax')
+                    ])
+                    loaded.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+                # Published last, so other threads never see a half-built model
+                model = loaded
+    return model
+
+inference_pool = None
+_inference_pool_lock = threading.Lock()
+
+def clone_replica(base_model):
+    """Create an independent copy of a model with the same weights"""
+    replica = clone_model(base_model)
+    replica.set_weights(base_model.get_weights())
+    return replica
+
+def get_inference_pool():
+    global inference_pool
+    if inference_pool is None:
+        with _inference_pool_lock:
+            if inference_pool is None:
+                base_model = get_model()
+                inference_pool = InferencePool(
+                    lambda index: base_model if index == 0 else clone_replica(base_model),
+                    replicas=settings.CLASSIFY_INFERENCE_REPLICAS,
+                    max_batch=settings.CLASSIFY_INFERENCE_MAX_BATCH
+                )
+    return inference_pool
+
+cascade = None
+cascade_loaded = False
+_cascade_lock = threading.Lock()
+
+def get_cascade():
+    """Confidence-gated fast/full cascade, or None when no fast model is configured"""
+    global cascade, cascade_loaded
+    if not cascade_loaded:
+        with _cascade_lock:
+            if not cascade_loaded:
+                cascade = _load_cascade()
+                cascade_loaded = True
+    return cascade
+
+def _load_cascade():
+    fast_model_path = settings.CLASSIFY_CASCADE_MODEL_PATH
+    if not cascade_enabled(fast_model_path):
+        return None
+    try:
+        loaded = CascadeClassifier(
+            load_fast_model(fast_model_path),
+            get_inference_pool().predict,
+            threshold=settings.CLASSIFY_CASCADE_THRESHOLD,
+            audit_rate=settings.CLASSIFY_CASCADE_AUDIT_RATE,
+            log_path=settings.CLASSIFY_CASCADE_LOG,
+            executor=get_executor()
+        )
+    except Exception as e:
+        print(f"Error loading fast model, cascade disabled: {e}")
+        return None
+    print(f"Model cascade enabled with fast model {fast_model_path}")
+    return loaded
+
+reference_index = None
+feature_extractor = None
+
+def get_reference_index():
+    """Similar-image index, or None when it has not been built"""
+    global reference_index
+    if reference_index is None and ReferenceIndex.exists(settings.CLASSIFY_REFERENCE_INDEX_DIR):
+        reference_index = ReferenceIndex(settings.CLASSIFY_REFERENCE_INDEX_DIR)
+        print(f"Loaded reference index with {len(reference_index)} images")
+    return reference_index
+
+def get_feature_extractor():
+    global feature_extractor
+    if feature_extractor is None:
+        feature_extractor = build_feature_extractor(get_model())
+    return feature_extractor
+
+def find_similar_references(img_batch, index, k):
+    try:
+        query = embed(get_feature_extractor(), img_batch)[0]
+        return index.search(query, k=k, n_probe=settings.CLASSIFY_REFERENCE_N_PROBE)
+    except Exception as e:
+        print(f"Error searching reference index: {e}")
+        return None
+
+def gradient_magnitudes(img_batch, model, class_indices):
+    """Gradient magnitude maps for several classes from a single batched tape pass
+
+    A single image is repeated once per class and each copy's gradient is
+    taken with respect to its own class score, so one forward and one
+    backward pass cover every class. A batch of k images is paired with the
+    k classes directly. Returns three (k, H, W) arrays.
+    """
+    img_tensor = tf.convert_to_tensor(img_batch)
+    if len(img_batch) == 1 and len(class_indices) > 1:
+        img_tensor = tf.repeat(img_tensor, len(class_indices), axis=0)
+
+    with tf.GradientTape() as tape:
+        tape.watch(img_tensor)
+        predictions = model(img_tensor)
+        target_score = tf.reduce_sum(predictions * tf.one_hot(class_indices, predictions.shape[-1]))
+
+    grads = tape.gradient(target_score, img_tensor)
+
+    grad_mag = tf.reduce_max(tf.abs(grads), axis=-1).numpy()
+    guided_grads = tf.cast(grads > 0, tf.float32) * grads
+    guided_mag = tf.reduce_sum(guided_grads, axis=-1).numpy()
+    grad_input = grads * img_tensor
+    grad_input_mag = tf.reduce_sum(tf.abs(grad_input), axis=-1).numpy()
+
+    return grad_mag, guided_mag, grad_input_mag
+
+def compute_saliency(img_batch, model, pred_class):
+    """Composite gradient saliency for pred_class as a [0, 1] map (per-thread buffer)"""
+    grad_mag, guided_mag, grad_input_mag = gradient_magnitudes(img_batch, model, [pred_class])
+    return composite_heatmap(grad_mag[0], guided_mag[0], grad_input_mag[0])
+
+def generate_gradcam_overlay(original_img, img_batch, model, pred_class):
+    try:
+        heatmap = compute_saliency(img_batch, model, pred_class)
+        return overlay_heatmap(original_img, heatmap)
+    except Exception as e:
+        print(f"Error generating heatmap: {e}")
+        # Return original image if heatmap generation fails
+        return original_img
+
+def generate_raw_saliency(img_batch, model, pred_class, size, dtype):
+    try:
+        heatmap = compute_saliency(img_batch, model, pred_class)
+        return encode_saliency(heatmap, size=size, dtype=dtype)
+    except Exception as e:
+        print(f"Error generating heatmap: {e}")
+        return None
+
+def generate_top_k_explanations(img_batch, model, predictions, k, size, dtype):
+    """Raw saliency maps for the k most probable classes, computed in one batched pass"""
+    top_classes = [int(i) for i in np.argsort(predictions)[::-1][:k]]
+    try:
+        grad_mag, guided_mag, grad_input_mag = gradient_magnitudes(img_batch, model, top_classes)
+    except Exception as e:
+        print(f"Error generating explanations: {e}")
+        return None
+
+    explanations = []
+    for i, class_index in enumerate(top_classes):
+        heatmap = composite_heatmap(grad_mag[i], guided_mag[i], grad_input_mag[i])
+        explanations.append({
+            "class": class_names[class_index],
+            "confidence": round(float(predictions[class_index]), 3),
+            "heatmap": encode_saliency(heatmap, size=size, dtype=dtype)
+        })
+    return explanations
+
+def generate_explanation(img_batch, model, method, class_index, size, dtype):
+    """Perturbation-based explanation for class_index, encoded like a raw saliency map"""
+    try:
+        heatmap = explain(
+            method, model, img_batch[0], class_index,
+            max_bytes=settings.CLASSIFY_EXPLANATION_MEMORY_MB * 2**20
+        )
+        return {"method": method, "heatmap": encode_saliency(heatmap, size=size, dtype=dtype)}
+    except Exception as e:
+        print(f"Error generating {method} explanation: {e}")
+        return None
+
+def predict_regions(image_file):
+    """Classify multi-scale tiles of the full-resolution image in one batch and merge them into regions"""
+    unreachable = unreachable_scales(settings.CLASSIFY_TILE_SCALES, settings.CLASSIFY_TILE_MAX)
+    if unreachable:
+        raise ImproperlyConfigured(
+            f"CLASSIFY_TILE_MAX={settings.CLASSIFY_TILE_MAX} is too small for tile scales {unreachable} "
+            f"on a 4:3 image; raise it or drop those scales"
+        )
+    img = open_upload(image_file)
+    boxes = tile_boxes(
+        img.width, img.height,
+        scales=settings.CLASSIFY_TILE_SCALES,
+        max_tiles=settings.CLASSIFY_TILE_MAX
+    )
+    batch = tiles_into(img, boxes, get_tile_buffer(settings.CLASSIFY_TILE_MAX))
+    get_model()
+    predictions = get_inference_pool().predict(batch)
+
+    regions = []
+    for region in merge_tiles(boxes, predictions, threshold=settings.CLASSIFY_TILE_THRESHOLD):
+        regions.append({
+            "box": list(region["box"]),
+            "prediction": class_names[region["class_index"]],
+            "confidence": round(region["confidence"], 3),
+            "tiles": region["tiles"],
+            "fish_info": species_table[region["class_index"]]
+        })
+    return {"image_size": [img.width, img.height], "tiles": len(boxes), "regions": regions}
+
+def write_overlay_image(overlay_img):
+    """Save an RGB overlay under MEDIA_ROOT, returning its filename"""
+    filename = f"overlay_{uuid.uuid4().hex}.png"
+    cv2.imwrite(os.path.join(settings.MEDIA_ROOT, filename), overlay_img)
+    return filename
@@ -0,0 +1,124 @@
+"""
+Embedding index for "visually similar reference images" lookups
+Reference images are embedded with the classifier's penultimate layer and
+stored as a memory-mapped NumPy matrix; queries are vectorized cosine top-k,
+optionally restricted to the nearest partitions (IVF) for large galleries
+"""
+import json
+import os
+import numpy as np
+from keras.models import Model
+from fishapi.ranking import top_k
+
+EMBEDDINGS_FILE = 'embeddings.npy'
+CENTROIDS_FILE = 'centroids.npy'
+OFFSETS_FILE = 'offsets.npy'
+METADATA_FILE = 'references.json'
+
+
+def build_feature_extractor(model):
+    """Model mapping images to the classifier's penultimate layer activations"""
+    return Model(inputs=model.inputs, outputs=model.layers[-2].output)
+
+
+def l2_normalize(vectors):
+    vectors = vectors.reshape(len(vectors), -1).astype(np.float32, copy=False)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.maximum(norms, np.float32(1e-12), out=norms)
+    return vectors / norms
+
+
+def embed(extractor, batch):
+    """Unit-length embeddings for a float32 image batch"""
+    return l2_normalize(np.asarray(extractor(batch, training=False)))
+
+
+def spherical_kmeans(vectors, partitions, iterations=10, seed=0):
+    """Cluster unit vectors by cosine similarity, returning (centroids, assignments)"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), partitions, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty partitions with random members
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = l2_normalize(sums)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+def write_index(index_dir, embeddings, references, partitions=0):
+    """Persist an index; with partitions > 0 rows are grouped by nearest centroid
+
+    references is a list of dicts (e.g. path and label) aligned with the
+    embedding rows.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    embeddings = l2_normalize(embeddings)
+
+    for stale in (CENTROIDS_FILE, OFFSETS_FILE):
+        if os.path.exists(os.path.join(index_dir, stale)):
+            os.remove(os.path.join(index_dir, stale))
+
+    if partitions and len(embeddings) > partitions:
+        centroids, assignments = spherical_kmeans(embeddings, partitions)
+        order = np.argsort(assignments, kind='stable')
+        embeddings = embeddings[order]
+        references = [references[i] for i in order]
+        offsets = np.searchsorted(assignments[order], np.arange(partitions + 1))
+        np.save(os.path.join(index_dir, CENTROIDS_FILE), centroids)
+        np.save(os.path.join(index_dir, OFFSETS_FILE), offsets)
+
+    np.save(os.path.join(index_dir, EMBEDDINGS_FILE), embeddings)
+    with open(os.path.join(index_dir, METADATA_FILE), 'w') as f:
+        json.dump(references, f)
+
+
+class ReferenceIndex:
+    """Read-only, memory-mapped reference embedding index"""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode='r')
+        with open(os.path.join(index_dir, METADATA_FILE)) as f:
+            self.references = json.load(f)
+
+        centroids_path = os.path.join(index_dir, CENTROIDS_FILE)
+        if os.path.exists(centroids_path):
+            self.centroids = np.load(centroids_path)
+            self.offsets = np.load(os.path.join(index_dir, OFFSETS_FILE))
+        else:
+            self.centroids = None
+            self.offsets = None
+
+    def __len__(self):
+        return len(self.references)
+
+    @classmethod
+    def exists(cls, index_dir):
+        return os.path.exists(os.path.join(index_dir, EMBEDDINGS_FILE))
+
+    def search(self, query, k=5, n_probe=None):
+        """Top-k references by cosine similarity to a unit-length query vector
+
+        With a partitioned index only the n_probe partitions whose centroids
+        are closest to the query are scanned; n_probe=None scans everything.
+        """
+        if self.centroids is not None and n_probe and n_probe < len(self.centroids):
+            partitions = top_k(self.centroids @ query, n_probe)
+            rows = np.concatenate([
+                np.arange(self.offsets[p], self.offsets[p + 1]) for p in np.sort(partitions)
+            ])
+            scores = self.embeddings[rows] @ query
+            best = rows[top_k(scores, k)]
+            best_scores = self.embeddings[best] @ query
+        else:
+            scores = self.embeddings @ query
+            best = top_k(scores, k)
+            best_scores = scores[best]
+
+        return [
+            {**self.references[i], "score": round(float(score), 4)}
+            for i, score in zip(best, best_scores)
+        ]
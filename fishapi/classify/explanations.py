@@ -0,0 +1,92 @@
+"""
+Batched perturbation-based explanations (SmoothGrad and occlusion sensitivity)
+All perturbations are built as NumPy batches, chunked to a memory cap, run
+through a few large forward passes and reduced with vectorized operations
+"""
+import numpy as np
+import tensorflow as tf
+from .saliency import normalize_into
+from .tiling import window_starts
+
+EXPLANATION_METHODS = ('smoothgrad', 'occlusion')
+
+
+def chunk_size(image, total, max_bytes):
+    """Number of perturbed copies of image that fit in max_bytes (at least 1, at most total)"""
+    return int(max(1, min(total, max_bytes // image.nbytes)))
+
+
+def smoothgrad(model, image, class_index, samples=32, noise_level=0.15, max_bytes=256 * 2**20, seed=None):
+    """SmoothGrad saliency: mean gradient magnitude over noisy copies of the image
+
+    image is a float32 (H, W, C) array scaled to [0, 1]. Returns a [0, 1]
+    float32 (H, W) map.
+    """
+    rng = np.random.default_rng(seed)
+    sigma = np.float32(noise_level * (image.max() - image.min()))
+    total = np.zeros(image.shape[:2], dtype=np.float32)
+    step = chunk_size(image, samples, max_bytes)
+
+    for start in range(0, samples, step):
+        count = min(step, samples - start)
+        batch = rng.standard_normal((count,) + image.shape, dtype=np.float32)
+        np.multiply(batch, sigma, out=batch)
+        np.add(batch, image, out=batch)
+
+        batch_tensor = tf.convert_to_tensor(batch)
+        with tf.GradientTape() as tape:
+            tape.watch(batch_tensor)
+            target_score = tf.reduce_sum(model(batch_tensor)[:, class_index])
+        grads = tape.gradient(target_score, batch_tensor)
+
+        # Sum of per-pixel channel-max magnitudes across the chunk
+        total += tf.reduce_sum(tf.reduce_max(tf.abs(grads), axis=-1), axis=0).numpy()
+
+    return normalize_into(total, total)
+
+
+def occlusion(model, image, class_index, window=32, stride=16, baseline=0.0, max_bytes=256 * 2**20):
+    """Occlusion sensitivity: drop in class score when each window is masked out
+
+    Every occluded copy is generated from separable row / column masks, so
+    the batch is built and the per-pixel average drop is reduced without
+    Python loops over pixels. Returns a [0, 1] float32 (H, W) map.
+    """
+    height, width = image.shape[:2]
+    ys = np.array(window_starts(height, window, stride))
+    xs = np.array(window_starts(width, window, stride))
+    ys, xs = np.repeat(ys, len(xs)), np.tile(xs, len(ys))
+
+    rows, cols = np.arange(height), np.arange(width)
+    row_masks = (rows >= ys[:, None]) & (rows < ys[:, None] + window)
+    col_masks = (cols >= xs[:, None]) & (cols < xs[:, None] + window)
+
+    base_score = float(model(image[None], training=False)[0, class_index])
+    scores = np.empty(len(ys), dtype=np.float32)
+    baseline = np.float32(baseline)
+    step = chunk_size(image, len(ys), max_bytes)
+
+    for start in range(0, len(ys), step):
+        end = min(start + step, len(ys))
+        masks = row_masks[start:end, :, None] & col_masks[start:end, None, :]
+        batch = np.where(masks[..., None], baseline, image[None])
+        scores[start:end] = np.asarray(model(batch, training=False))[:, class_index]
+
+    # Average score drop of the windows covering each pixel
+    drops = np.maximum(base_score - scores, 0).astype(np.float32)
+    row_masks = row_masks.astype(np.float32)
+    col_masks = col_masks.astype(np.float32)
+    heatmap = (row_masks * drops[:, None]).T @ col_masks
+    counts = row_masks.T @ col_masks
+    np.divide(heatmap, np.maximum(counts, 1), out=heatmap)
+
+    return normalize_into(heatmap, heatmap)
+
+
+def explain(method, model, image, class_index, max_bytes=256 * 2**20):
+    """Run one of EXPLANATION_METHODS on a float32 (H, W, C) image"""
+    if method == 'smoothgrad':
+        return smoothgrad(model, image, class_index, max_bytes=max_bytes)
+    if method == 'occlusion':
+        return occlusion(model, image, class_index, max_bytes=max_bytes)
+    raise ValueError(f"Unknown explanation method '{method}'")
@@ -0,0 +1,115 @@
+"""
+Multi-replica inference pool
+Runs K model replicas on dedicated worker threads and dispatches work to
+the replica with the shortest queue. Replicas are not pinned to cores:
+TensorFlow's intra-op thread pool is process-wide, so every replica's
+forward pass runs on the same set of threads
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future
+import numpy as np
+
+
+def available_cpus():
+    """CPU ids this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class _Replica:
+    """A model instance served by a single worker thread"""
+
+    def __init__(self, index, model, max_batch):
+        self.index = index
+        self.model = model
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.pending = 0
+        self._lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name=f"inference-replica-{index}", daemon=True)
+        self.thread.start()
+
+    def submit(self, batch, future):
+        with self._lock:
+            self.pending += len(batch)
+        self.queue.put((batch, future))
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            # Drain whatever else is queued into one forward pass
+            items = [item]
+            rows = len(item[0])
+            while rows < self.max_batch:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                items.append(item)
+                rows += len(item[0])
+
+            self._process(items, rows)
+
+    def _process(self, items, rows):
+        try:
+            inputs = items[0][0] if len(items) == 1 else np.concatenate([batch for batch, _ in items])
+            outputs = np.asarray(self.model(inputs, training=False))
+            offset = 0
+            for batch, future in items:
+                future.set_result(outputs[offset:offset + len(batch)])
+                offset += len(batch)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                self.pending -= rows
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+class InferencePool:
+    """Pool of model replicas with queue-depth based dispatch
+
+    model_factory(index) must return a model for replica `index`; replicas
+    should be independent instances so that calls do not contend on the
+    same Python-level state. Inputs are float32 batches with a leading
+    batch axis; results are the model's output rows for that batch.
+    """
+
+    def __init__(self, model_factory, replicas=1, max_batch=8):
+        self._replicas = [
+            _Replica(index, model_factory(index), max_batch)
+            for index in range(replicas)
+        ]
+        self._dispatch_lock = threading.Lock()
+        print(f"Inference pool started with {replicas} replica(s)")
+
+    def submit(self, batch):
+        """Queue a batch on the least loaded replica and return a Future for its predictions"""
+        future = Future()
+        with self._dispatch_lock:
+            replica = min(self._replicas, key=lambda r: r.pending)
+            replica.submit(batch, future)
+        return future
+
+    def predict(self, batch):
+        """Run a batch through the pool and wait for its predictions"""
+        return self.submit(batch).result()
+
+    def close(self):
+        for replica in self._replicas:
+            replica.close()
@@ -0,0 +1,24 @@
+"""
+Plain Django views for the dedicated inference entry point (fishapi.inference_wsgi)
+Same handlers as classify.views, without DRF's request parsing and content negotiation
+"""
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+from .views import classify_upload, find_similar, cascade_summary
+
+
+@require_POST
+def predict_image(request):
+    body, status = classify_upload(request.FILES, request.POST)
+    return JsonResponse(body, status=status)
+
+
+@require_POST
+def similar_images(request):
+    body, status = find_similar(request.FILES, request.POST)
+    return JsonResponse(body, status=status)
+
+
+@require_GET
+def cascade_stats(request):
+    return JsonResponse(cascade_summary())
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ENTRY_POINTS = ('fishapi.wsgi', 'fishapi.inference_wsgi')
+
+# Each entry point runs in its own interpreter, as the two use different settings.
+# Requests are WSGI environs passed straight to the application, so only the
+# Django / DRF request handling and the view itself are measured.
+BENCHMARK_SCRIPT = """
+import importlib, io, json, sys, time
+import numpy as np
+
+entry_point, requests, warmup = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+application = importlib.import_module(entry_point).application
+
+from django.test.client import encode_multipart, BOUNDARY
+from classify.preprocessing import INPUT_SHAPE
+
+tensor = np.random.default_rng(0).integers(0, 256, INPUT_SHAPE, dtype=np.uint8).tobytes()
+upload = io.BytesIO(tensor)
+upload.name = 'tensor.bin'
+
+def environ(method, path, body=b'', content_type=''):
+    return {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'CONTENT_TYPE': content_type, 'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+
+predict_body = encode_multipart(BOUNDARY, {'tensor': upload, 'heatmap_format': 'raw', 'heatmap_size': '8'})
+endpoints = {
+    'GET /predict/cascade/stats/': lambda: environ('GET', '/predict/cascade/stats/'),
+    'POST /predict/': lambda: environ(
+        'POST', '/predict/', predict_body, f'multipart/form-data; boundary={BOUNDARY}'
+    ),
+}
+
+def call(env):
+    status = []
+    body = b''.join(application(env, lambda s, headers, exc_info=None: status.append(s)))
+    if not status[0].startswith('200'):
+        raise RuntimeError(f"{status[0]}: {body[:200]}")
+
+for name, make_environ in endpoints.items():
+    for _ in range(warmup):
+        call(make_environ())
+    latencies = []
+    for _ in range(requests):
+        env = make_environ()
+        start = time.perf_counter()
+        call(env)
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies) * 1000
+    print(json.dumps({
+        'endpoint': name,
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+    }))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request latency of the full fishapi.wsgi app and the dedicated inference entry point'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'entry point':24} {'endpoint':28} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for entry_point in ENTRY_POINTS:
+            env = dict(os.environ)
+            env.pop('DJANGO_SETTINGS_MODULE', None)
+            completed = subprocess.run(
+                [sys.executable, '-c', BENCHMARK_SCRIPT, entry_point,
+                 str(options['requests']), str(options['warmup'])],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'unknown error'
+                self.stdout.write(self.style.ERROR(f"{entry_point}: failed ({error})"))
+                continue
+            for line in completed.stdout.splitlines():
+                if not line.startswith('{'):
+                    continue
+                result = json.loads(line)
+                self.stdout.write(
+                    f"{entry_point:24} {result['endpoint']:28} {result['mean_ms']:>9.2f} "
+                    f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f}"
+                )
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from django.core.management.base import BaseCommand
+from classify.inference_pool import InferencePool, available_cpus
+from classify.preprocessing import INPUT_SHAPE
+from classify.classifier_service import get_model, clone_replica
+
+
+class Command(BaseCommand):
+    help = 'Measure inference pool throughput for 1..N model replicas'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-replicas', type=int, default=len(available_cpus()))
+        parser.add_argument('--requests', type=int, default=256)
+        parser.add_argument('--clients', type=int, default=16, help='Concurrent request threads')
+        parser.add_argument('--max-batch', type=int, default=8)
+
+    def handle(self, *args, **options):
+        base_model = get_model()
+        rng = np.random.default_rng(0)
+        images = rng.random((options['clients'], 1) + INPUT_SHAPE, dtype=np.float32)
+        total = options['requests']
+
+        self.stdout.write(f"{'replicas':>8} {'images/s':>10} {'mean ms':>9} {'p95 ms':>8}")
+        for replicas in range(1, options['max_replicas'] + 1):
+            pool = InferencePool(
+                lambda index: base_model if index == 0 else clone_replica(base_model),
+                replicas=replicas,
+                max_batch=options['max_batch']
+            )
+            # Warm up every replica
+            for future in [pool.submit(images[0]) for _ in range(replicas * 2)]:
+                future.result()
+
+            def timed_request(i):
+                start = time.perf_counter()
+                pool.predict(images[i % len(images)])
+                return time.perf_counter() - start
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['clients']) as executor:
+                latencies = np.array(list(executor.map(timed_request, range(total))))
+            elapsed = time.perf_counter() - start
+            pool.close()
+
+            self.stdout.write(
+                f"{replicas:>8} {total / elapsed:>10.1f} "
+                f"{latencies.mean() * 1000:>9.1f} {np.percentile(latencies, 95) * 1000:>8.1f}"
+            )
@@ -0,0 +1,62 @@
+import time
+import numpy as np
+import cv2
+from django.core.management.base import BaseCommand
+from classify.saliency import composite_heatmap, overlay_heatmap
+
+
+def normalize(x):
+    """Normalize an array to the [0, 1] range"""
+    return (x - np.min(x)) / (np.max(x) - np.min(x) + 1e-10)
+
+
+def legacy_postprocess(original_img, grad_mag, guided_mag, grad_input_mag):
+    """Original post-processing from generate_gradcam_overlay, kept as the baseline"""
+    composite = (normalize(grad_mag) + normalize(guided_mag) + normalize(grad_input_mag)) / 3
+    composite = cv2.GaussianBlur(composite, (5, 5), 0)
+    composite = normalize(composite)
+
+    heatmap_colored = cv2.applyColorMap(np.uint8(255 * composite), cv2.COLORMAP_JET)
+    heatmap_colored = cv2.cvtColor(heatmap_colored, cv2.COLOR_BGR2RGB)
+
+    return cv2.addWeighted(original_img.astype('uint8'), 0.6, heatmap_colored, 0.4, 0)
+
+
+def vectorized_postprocess(original_img, grad_mag, guided_mag, grad_input_mag, out):
+    heatmap = composite_heatmap(grad_mag, guided_mag, grad_input_mag)
+    return overlay_heatmap(original_img, heatmap, out=out)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark saliency post-processing against the original implementation'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500)
+        parser.add_argument('--size', type=int, default=224)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        size = options['size']
+        iterations = options['iterations']
+
+        original_img = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+        grads = rng.standard_normal((3, size, size)).astype(np.float32)
+        grad_mag, guided_mag, grad_input_mag = np.abs(grads[0]), np.maximum(grads[1], 0), np.abs(grads[2])
+        out = np.empty((size, size, 3), dtype=np.uint8)
+
+        legacy = legacy_postprocess(original_img, grad_mag, guided_mag, grad_input_mag)
+        current = vectorized_postprocess(original_img, grad_mag, guided_mag, grad_input_mag, out)
+        max_diff = int(np.abs(legacy.astype(np.int16) - current.astype(np.int16)).max())
+        self.stdout.write(f'Max pixel difference vs original: {max_diff}')
+
+        for name, run in (
+            ('original', lambda: legacy_postprocess(original_img, grad_mag, guided_mag, grad_input_mag)),
+            ('vectorized', lambda: vectorized_postprocess(original_img, grad_mag, guided_mag, grad_input_mag, out)),
+        ):
+            run()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                run()
+            elapsed = (time.perf_counter() - start) / iterations
+            self.stdout.write(self.style.SUCCESS(f'{name:>10}: {elapsed * 1000:.3f} ms per image'))
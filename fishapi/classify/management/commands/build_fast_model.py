@@ -0,0 +1,32 @@
+import os
+import tensorflow as tf
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from classify.classifier_service import get_model
+
+
+class Command(BaseCommand):
+    help = 'Build the quantized TFLite model used as the first stage of the model cascade'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.CLASSIFY_CASCADE_MODEL_PATH)
+        parser.add_argument(
+            '--quantization', choices=['dynamic', 'float16'], default='dynamic',
+            help='dynamic: int8 weights with float activations; float16: half-precision weights'
+        )
+
+    def handle(self, *args, **options):
+        converter = tf.lite.TFLiteConverter.from_keras_model(get_model())
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if options['quantization'] == 'float16':
+            converter.target_spec.supported_types = [tf.float16]
+        tflite_model = converter.convert()
+
+        with open(options['output'], 'wb') as f:
+            f.write(tflite_model)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['quantization']} quantized model to {options['output']} "
+            f"({os.path.getsize(options['output']) / 2**20:.1f} MB)"
+        ))
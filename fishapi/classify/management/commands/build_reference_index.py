@@ -0,0 +1,60 @@
+import os
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from classify.embeddings import build_feature_extractor, embed, write_index
+from classify.preprocessing import INPUT_SHAPE, decode_into, scale_into, list_images
+from classify.classifier_service import get_model
+
+
+class Command(BaseCommand):
+    help = 'Embed a directory of reference images into the similar-image index'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('image_dir', help='Reference images; sub-directory names are used as labels')
+        parser.add_argument(
+            '--output', default=settings.CLASSIFY_REFERENCE_INDEX_DIR,
+            help='Index directory (defaults to CLASSIFY_REFERENCE_INDEX_DIR, currently %(default)s)'
+        )
+        parser.add_argument('--batch-size', type=int, default=32)
+        parser.add_argument(
+            '--partitions', type=int, default=0,
+            help='Number of IVF partitions (0 builds a flat index that is always scanned in full)'
+        )
+
+    def handle(self, *args, **options):
+        image_dir = options['image_dir']
+        paths = list_images(image_dir)
+        if not paths:
+            raise CommandError(f'No images found in {image_dir}')
+
+        extractor = build_feature_extractor(get_model())
+        batch_size = options['batch_size']
+        image = np.empty(INPUT_SHAPE, dtype=np.uint8)
+        batch = np.empty((batch_size,) + INPUT_SHAPE, dtype=np.float32)
+        chunks = []
+        references = []
+
+        for start in range(0, len(paths), batch_size):
+            count = 0
+            for path in paths[start:start + batch_size]:
+                try:
+                    with open(path, 'rb') as f:
+                        decode_into(f, image)
+                except Exception as e:
+                    self.stdout.write(self.style.WARNING(f'Skipping {path}: {e}'))
+                    continue
+                scale_into(image, batch[count])
+                relative = os.path.relpath(path, image_dir)
+                label = os.path.dirname(relative).split(os.sep)[0] or None
+                references.append({"path": relative, "label": label})
+                count += 1
+            if count:
+                chunks.append(embed(extractor, batch[:count]))
+            self.stdout.write(f'Embedded {min(start + batch_size, len(paths))}/{len(paths)} images')
+
+        write_index(options['output'], np.concatenate(chunks), references, partitions=options['partitions'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote index of {len(references)} images to {options['output']}"
+        ))
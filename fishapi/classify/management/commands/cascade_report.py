@@ -0,0 +1,46 @@
+import json
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Summarise the model cascade log to help choose a confidence threshold'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.CLASSIFY_CASCADE_LOG)
+        parser.add_argument('--thresholds', default='0.5,0.6,0.7,0.8,0.85,0.9,0.95,0.99')
+
+    def handle(self, *args, **options):
+        records = []
+        with open(options['log']) as f:
+            for line in f:
+                records.append(json.loads(line))
+        if not records:
+            self.stdout.write('Cascade log is empty')
+            return
+
+        fast = np.array([r['fast'] for r in records])
+        fast_confidence = fast.max(axis=1)
+        stages = np.array([r['stage'] for r in records])
+        self.stdout.write(
+            f"{len(records)} requests, {np.mean(stages == 'fast'):.1%} resolved by the fast model "
+            f"at the logged thresholds"
+        )
+
+        # Only records with both outputs can measure agreement
+        paired = [r for r in records if r['full'] is not None]
+        if not paired:
+            self.stdout.write('No requests with both model outputs logged yet')
+            return
+        paired_fast = np.array([r['fast'] for r in paired])
+        paired_full = np.array([r['full'] for r in paired])
+        paired_confidence = paired_fast.max(axis=1)
+        agrees = paired_fast.argmax(axis=1) == paired_full.argmax(axis=1)
+
+        self.stdout.write(f"{'threshold':>9} {'fast share':>10} {'agreement':>10}")
+        for threshold in (float(t) for t in options['thresholds'].split(',')):
+            accepted = paired_confidence >= threshold
+            agreement = f"{agrees[accepted].mean():.1%}" if accepted.any() else '-'
+            self.stdout.write(f"{threshold:>9.2f} {np.mean(fast_confidence >= threshold):>10.1%} {agreement:>10}")
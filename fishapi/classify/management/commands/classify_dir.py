@@ -0,0 +1,152 @@
+import csv
+import json
+import os
+import numpy as np
+import tensorflow as tf
+import cv2
+from django.core.management.base import BaseCommand, CommandError
+from classify.preprocessing import INPUT_SHAPE, decode_into, scale_into, list_images
+from classify.saliency import composite_heatmap, overlay_heatmap
+from classify.classifier_service import get_model, class_names, gradient_magnitudes
+
+CSV_FIELDS = ['path', 'prediction', 'confidence', 'heatmap', 'error']
+
+
+def load_image(path):
+    """Decode one file with the API's preprocessing, returning (uint8 image, error message)"""
+    image = np.zeros(INPUT_SHAPE, dtype=np.uint8)
+    try:
+        with open(path.decode(), 'rb') as f:
+            decode_into(f, image)
+        return image, b''
+    except Exception as e:
+        return image, str(e).encode()
+
+
+def build_dataset(paths, batch_size):
+    """Parallel decode -> batch -> prefetch pipeline over image paths"""
+    def load(path):
+        image, error = tf.numpy_function(load_image, [path], [tf.uint8, tf.string])
+        image.set_shape(INPUT_SHAPE)
+        error.set_shape(())
+        return path, image, error
+
+    return (
+        tf.data.Dataset.from_tensor_slices(paths)
+        .map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+        .batch(batch_size)
+        .prefetch(tf.data.AUTOTUNE)
+    )
+
+
+class Command(BaseCommand):
+    help = 'Classify every image in a directory, writing results incrementally to CSV or JSONL'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('input_dir')
+        parser.add_argument('output', help='Results file; .csv writes CSV, anything else JSON lines')
+        parser.add_argument('--batch-size', type=int, default=64)
+        parser.add_argument('--heatmaps', metavar='DIR', help='Also write a saliency overlay per image to DIR')
+        parser.add_argument('--checkpoint', help='Progress file (default: <output>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Ignore any checkpoint and start over')
+
+    def handle(self, *args, **options):
+        input_dir = options['input_dir']
+        output = options['output']
+        checkpoint_path = options['checkpoint'] or f'{output}.checkpoint'
+        as_csv = output.lower().endswith('.csv')
+
+        paths = list_images(input_dir)
+        if not paths:
+            raise CommandError(f'No images found in {input_dir}')
+
+        # The checkpoint records how many of the sorted paths are done and how
+        # long the output was at that point; anything written after it is
+        # discarded so results are never duplicated
+        processed, output_bytes = 0, 0
+        if os.path.exists(checkpoint_path) and not options['restart']:
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('total') != len(paths):
+                raise CommandError(
+                    f'{checkpoint_path} was written for {checkpoint.get("total")} images but '
+                    f'{input_dir} now has {len(paths)}; use --restart to start over'
+                )
+            processed, output_bytes = checkpoint['processed'], checkpoint['output_bytes']
+            self.stdout.write(f'Resuming after {processed}/{len(paths)} images')
+
+        if options['heatmaps']:
+            os.makedirs(options['heatmaps'], exist_ok=True)
+
+        model = get_model()
+        batch_size = options['batch_size']
+        batch = np.empty((batch_size,) + INPUT_SHAPE, dtype=np.float32)
+
+        with open(output, 'a+', newline='') as out:
+            out.truncate(output_bytes)
+            out.seek(output_bytes)
+            writer = csv.DictWriter(out, fieldnames=CSV_FIELDS) if as_csv else None
+            if writer and output_bytes == 0:
+                writer.writeheader()
+
+            for batch_paths, images, errors in build_dataset(paths[processed:], batch_size):
+                count = len(batch_paths)
+                for i in range(count):
+                    scale_into(images[i].numpy(), batch[i])
+                predictions = np.asarray(model(batch[:count], training=False))
+                class_indices = predictions.argmax(axis=1)
+
+                heatmaps = [None] * count
+                if options['heatmaps']:
+                    heatmaps = self._write_heatmaps(
+                        options['heatmaps'], batch_paths, images, errors, batch[:count], model, class_indices,
+                        processed
+                    )
+
+                for i in range(count):
+                    path = os.path.relpath(batch_paths[i].numpy().decode(), input_dir)
+                    error = errors[i].numpy().decode()
+                    row = {
+                        'path': path,
+                        'prediction': None if error else class_names[class_indices[i]],
+                        'confidence': None if error else round(float(predictions[i, class_indices[i]]), 4),
+                        'heatmap': heatmaps[i],
+                        'error': error or None,
+                    }
+                    if writer:
+                        writer.writerow(row)
+                    else:
+                        out.write(json.dumps(row) + '\n')
+
+                processed += count
+                out.flush()
+                os.fsync(out.fileno())
+                self._save_checkpoint(checkpoint_path, processed, out.tell(), len(paths))
+                self.stdout.write(f'Classified {processed}/{len(paths)} images')
+
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+
+    def _write_heatmaps(self, heatmap_dir, batch_paths, images, errors, batch, model, class_indices, offset):
+        # Images that failed to decode are all zeros; they get no heatmap
+        decoded = [i for i in range(len(batch)) if not errors[i].numpy()]
+        filenames = [None] * len(batch)
+        if not decoded:
+            return filenames
+        grad_mag, guided_mag, grad_input_mag = gradient_magnitudes(
+            batch[decoded], model, [int(class_indices[i]) for i in decoded]
+        )
+        for row, i in enumerate(decoded):
+            heatmap = composite_heatmap(grad_mag[row], guided_mag[row], grad_input_mag[row])
+            overlay = overlay_heatmap(images[i].numpy(), heatmap)
+            stem = os.path.splitext(os.path.basename(batch_paths[i].numpy().decode()))[0]
+            filename = f'{offset + i:07d}_{stem}.png'
+            cv2.imwrite(os.path.join(heatmap_dir, filename), overlay)
+            filenames[i] = filename
+        return filenames
+
+    def _save_checkpoint(self, checkpoint_path, processed, output_bytes, total):
+        temp_path = f'{checkpoint_path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'processed': processed, 'output_bytes': output_bytes, 'total': total}, f)
+        os.replace(temp_path, checkpoint_path)
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+DEFAULT_MODULES = (
+    'fishapi.urls',
+    'chatbot.views',
+    'chatbot.rag_service',
+    'classify.views',
+    'classify.classifier_service',
+)
+
+# Each module is imported in a fresh interpreter so earlier imports do not hide its cost
+IMPORT_SCRIPT = """
+import json, sys, django
+django.setup()
+from fishapi.import_report import timed_import
+print(json.dumps(timed_import(sys.argv[1])))
+"""
+
+
+class Command(BaseCommand):
+    help = 'Report the import time, peak memory and heavy libraries loaded by each module'
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'fishapi.settings'))
+        self.stdout.write(
+            f"serve classify: {settings.FISHAPI_SERVE_CLASSIFY}, serve chatbot: {settings.FISHAPI_SERVE_CHATBOT}"
+        )
+        for module_name in options['modules']:
+            completed = subprocess.run(
+                [sys.executable, '-c', IMPORT_SCRIPT, module_name],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+            )
+            if completed.returncode != 0:
+                error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'unknown error'
+                self.stdout.write(self.style.ERROR(f"{module_name}: failed ({error})"))
+                continue
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            heavy = ', '.join(result['heavy_modules']) or 'none'
+            self.stdout.write(
+                f"{module_name:32} {result['import_ms']:8.0f} ms  {result['max_rss_mb']:7.0f} MB  heavy: {heavy}"
+            )
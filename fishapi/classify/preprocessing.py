@@ -0,0 +1,119 @@
+"""
+Image preprocessing for the fish classifier
+Decodes uploads into reusable per-thread uint8 / float32 buffers
+"""
+import io
+import os
+import threading
+import numpy as np
+from PIL import Image
+
+# Model input resolution (width, height)
+INPUT_SIZE = (224, 224)
+INPUT_SHAPE = (INPUT_SIZE[1], INPUT_SIZE[0], 3)
+
+_buffers = threading.local()
+
+# Magic prefix of the .npy file format
+NPY_MAGIC = b'\x93NUMPY'
+
+# File types picked up when classifying or indexing a directory of images
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def list_images(directory):
+    """Sorted paths of the image files anywhere under directory"""
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(directory)
+        for name in files
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def get_buffers():
+    """Return this thread's (uint8 image, float32 batch) buffers
+
+    The batch has a leading axis of 1 and is shared by the prediction and
+    saliency paths of a request; it is overwritten by the next request
+    handled on the same thread.
+    """
+    if not hasattr(_buffers, 'image'):
+        _buffers.image = np.empty(INPUT_SHAPE, dtype=np.uint8)
+        _buffers.batch = np.empty((1,) + INPUT_SHAPE, dtype=np.float32)
+    return _buffers.image, _buffers.batch
+
+
+def decode_into(image_file, out):
+    """Decode an uploaded image, resize it to the model input size and write it into out"""
+    img = Image.open(image_file).convert("RGB")
+    if img.size != INPUT_SIZE:
+        img = img.resize(INPUT_SIZE)
+    np.copyto(out, np.asarray(img))
+    return out
+
+
+def scale_into(image, out):
+    """Scale a uint8 image to [0, 1] float32 in place of out"""
+    np.divide(image, np.float32(255.0), out=out)
+    return out
+
+
+def preprocess_upload(image_file):
+    """Decode an upload into this thread's buffers, returning (uint8 image, float32 batch)"""
+    image, batch = get_buffers()
+    decode_into(image_file, image)
+    scale_into(image, batch[0])
+    return image, batch
+
+
+def tensor_into(tensor_file, out):
+    """Copy a pre-resized uint8 tensor upload into out
+
+    The upload is either a .npy file or raw row-major bytes, and must have
+    the model input shape (224, 224, 3) with uint8 elements.
+    """
+    data = tensor_file.read()
+    if data.startswith(NPY_MAGIC):
+        try:
+            array = np.load(io.BytesIO(data), allow_pickle=False)
+        except (OSError, EOFError, ValueError) as e:
+            raise ValueError(f"Invalid .npy tensor: {e}")
+        if array.dtype != np.uint8 or array.shape != INPUT_SHAPE:
+            raise ValueError(
+                f"Tensor must be uint8 with shape {INPUT_SHAPE}, got {array.dtype} with shape {array.shape}"
+            )
+    else:
+        if len(data) != out.nbytes:
+            raise ValueError(f"Raw tensor must be {out.nbytes} bytes ({INPUT_SHAPE} uint8), got {len(data)}")
+        array = np.frombuffer(data, dtype=np.uint8).reshape(INPUT_SHAPE)
+    np.copyto(out, array)
+    return out
+
+
+def preprocess_tensor(tensor_file):
+    """Load a tensor upload into this thread's buffers, skipping decode and resize"""
+    image, batch = get_buffers()
+    tensor_into(tensor_file, image)
+    scale_into(image, batch[0])
+    return image, batch
+
+
+def get_tile_buffer(max_tiles):
+    """Return this thread's float32 buffer for up to max_tiles model inputs"""
+    if getattr(_buffers, 'tiles', None) is None or len(_buffers.tiles) < max_tiles:
+        _buffers.tiles = np.empty((max_tiles,) + INPUT_SHAPE, dtype=np.float32)
+    return _buffers.tiles
+
+
+def open_upload(image_file):
+    """Decode an upload at full resolution as an RGB PIL image"""
+    return Image.open(image_file).convert("RGB")
+
+
+def tiles_into(img, boxes, out):
+    """Crop each (left, top, right, bottom) box, resize it to the model input size and scale it into out"""
+    for i, box in enumerate(boxes):
+        tile = img.resize(INPUT_SIZE, box=box)
+        scale_into(np.asarray(tile), out[i])
+    return out[:len(boxes)]
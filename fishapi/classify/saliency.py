@@ -0,0 +1,105 @@
+"""
+Saliency post-processing and overlay compositing
+Float32 pipeline working in preallocated per-thread buffers
+"""
+import base64
+import threading
+import numpy as np
+import cv2
+
+# Blend weights used for the heatmap overlay
+IMAGE_WEIGHT = 0.6
+HEATMAP_WEIGHT = 0.4
+
+# Raw saliency responses: default edge length and supported element types
+RAW_SALIENCY_SIZE = 56
+RAW_SALIENCY_DTYPES = ('uint8', 'float16')
+
+
+def _build_rgb_colormap():
+    """Precompute the JET colormap as a 256 x 3 RGB lookup table"""
+    ramp = np.arange(256, dtype=np.uint8).reshape(256, 1)
+    bgr = cv2.applyColorMap(ramp, cv2.COLORMAP_JET).reshape(256, 3)
+    return np.ascontiguousarray(bgr[:, ::-1])
+
+
+RGB_COLORMAP = _build_rgb_colormap()
+
+_buffers = threading.local()
+
+
+def _get_buffers(shape):
+    """Return this thread's scratch buffers, (re)allocating them only when the shape changes"""
+    if getattr(_buffers, 'shape', None) != shape:
+        _buffers.shape = shape
+        _buffers.heatmap = np.empty(shape, dtype=np.float32)
+        _buffers.scratch = np.empty(shape, dtype=np.float32)
+        _buffers.indices = np.empty(shape, dtype=np.uint8)
+        _buffers.colored = np.empty(shape + (3,), dtype=np.uint8)
+    return _buffers
+
+
+def normalize_into(x, out):
+    """Min-max normalize x to the [0, 1] range, writing into out"""
+    low = x.min()
+    scale = np.float32(1.0) / (x.max() - low + np.float32(1e-10))
+    np.subtract(x, low, out=out)
+    np.multiply(out, scale, out=out)
+    return out
+
+
+def composite_heatmap(grad_mag, guided_mag, grad_input_mag):
+    """Combine three gradient magnitude maps into a smoothed [0, 1] heatmap
+
+    The result lives in a per-thread buffer and is only valid until the next
+    call on the same thread.
+    """
+    buffers = _get_buffers(grad_mag.shape)
+    heatmap, scratch = buffers.heatmap, buffers.scratch
+
+    # The average of the three maps is re-normalized after blurring, so the
+    # division by three is unnecessary
+    normalize_into(grad_mag, heatmap)
+    np.add(heatmap, normalize_into(guided_mag, scratch), out=heatmap)
+    np.add(heatmap, normalize_into(grad_input_mag, scratch), out=heatmap)
+
+    cv2.GaussianBlur(heatmap, (5, 5), 0, dst=scratch)
+    return normalize_into(scratch, heatmap)
+
+
+def overlay_heatmap(original_img, heatmap, out=None):
+    """Blend a [0, 1] heatmap, colored with the RGB JET table, over a uint8 RGB image"""
+    buffers = _get_buffers(heatmap.shape)
+    indices, colored = buffers.indices, buffers.colored
+
+    np.multiply(heatmap, np.float32(255), out=buffers.scratch)
+    np.copyto(indices, buffers.scratch, casting='unsafe')
+    np.take(RGB_COLORMAP, indices, axis=0, out=colored)
+
+    if out is None:
+        out = np.empty_like(colored)
+    cv2.addWeighted(original_img, IMAGE_WEIGHT, colored, HEATMAP_WEIGHT, 0, dst=out)
+    return out
+
+
+def encode_saliency(heatmap, size=RAW_SALIENCY_SIZE, dtype='uint8'):
+    """Downsample a [0, 1] heatmap and pack it as a compact base64 array
+
+    uint8 values are the heatmap quantized to 0-255; float16 values are the
+    [0, 1] heatmap itself. Data is row-major with shape (size, size).
+    """
+    if dtype not in RAW_SALIENCY_DTYPES:
+        raise ValueError(f"Unsupported saliency dtype '{dtype}'")
+
+    small = cv2.resize(heatmap, (size, size), interpolation=cv2.INTER_AREA)
+    if dtype == 'uint8':
+        np.multiply(small, np.float32(255), out=small)
+        np.add(small, np.float32(0.5), out=small)
+    data = small.astype(dtype)
+
+    return {
+        "shape": [size, size],
+        "dtype": dtype,
+        "encoding": "base64",
+        "data": base64.b64encode(data.tobytes()).decode('ascii')
+    }
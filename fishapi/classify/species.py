@@ -0,0 +1,65 @@
+"""
+Class index -> species metadata table for classification responses
+Resolved once when the model is loaded so that request handling is a plain list lookup
+"""
+
+# Class labels
+class_names = [
+    "Bulath_hapaya", "Dankuda_pethiya", "Depulliya",
+    "Halamal_dandiya", "Lethiththaya", "Pathirana_salaya", "Thal_kossa"
+]
+
+# Classifier label -> ontology species key (scientific name, lower-cased, underscored).
+# Labels without a record in the ontology map to None and return no fish_info.
+CLASS_SPECIES_KEYS = {
+    "Bulath_hapaya": "pethia_nigrofasciata",
+    "Dankuda_pethiya": None,
+    "Depulliya": "pethia_cumingii",
+    "Halamal_dandiya": None,
+    "Lethiththaya": "puntius_titteya",
+    "Pathirana_salaya": "devario_pathirana",
+    "Thal_kossa": "belontia_signata",
+}
+
+
+def species_summary(fish_info):
+    """Summarise an ontology species record for classification results"""
+    return {
+        "scientific_name": fish_info['scientific'],
+        "vernacular_name": fish_info['vernacular'],
+        "common_name": fish_info['common'],
+        "family": fish_info['family'],
+        "iucn_status": fish_info['iucn_status'],
+        "description": fish_info['description']
+    }
+
+
+def build_species_table(class_names, fish_species_mapping):
+    """Build a list indexed by class index holding each class's fish_info (or None)
+
+    Every mapped label is validated against the ontology records; labels whose
+    species is missing are reported and resolve to None.
+    """
+    table = []
+    for class_name in class_names:
+        if class_name not in CLASS_SPECIES_KEYS:
+            print(f"Warning: no species mapping defined for class '{class_name}'")
+            table.append(None)
+            continue
+
+        species_key = CLASS_SPECIES_KEYS[class_name]
+        if species_key is None:
+            table.append(None)
+            continue
+
+        fish_info = fish_species_mapping.get(species_key)
+        if fish_info is None:
+            print(f"Warning: species '{species_key}' for class '{class_name}' not found in ontology")
+            table.append(None)
+            continue
+
+        table.append(species_summary(fish_info))
+
+    resolved = sum(1 for entry in table if entry is not None)
+    print(f"Resolved species metadata for {resolved}/{len(class_names)} classes")
+    return tuple(table)
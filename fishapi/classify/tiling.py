@@ -0,0 +1,127 @@
+"""
+Multi-fish support via tiled, multi-scale sliding-window classification
+Every tile is classified in one batched forward pass and overlapping
+confident tiles are merged into per-region species predictions
+"""
+import numpy as np
+
+
+def window_starts(length, window, stride):
+    """Window start offsets covering [0, length), including the trailing edge"""
+    starts = list(range(0, max(length - window, 0) + 1, stride))
+    if starts[-1] + window < length:
+        starts.append(length - window)
+    return starts
+
+
+def tile_boxes(width, height, scales=(1.0, 0.6, 0.35), overlap=0.5, max_tiles=64):
+    """Square tile boxes (left, top, right, bottom) at each scale of the shorter image side
+
+    Scales are taken in order and a scale is only added if all of its tiles
+    fit in the remaining budget, so every included scale covers the whole
+    image and the number of tiles never exceeds max_tiles. If no scale fits,
+    as on a very wide or very tall image, a single full-frame tile is returned
+    so the image is still classified as a whole, like single mode does.
+    """
+    boxes = []
+    for scale in scales:
+        side = max(1, int(min(width, height) * scale))
+        stride = max(1, int(side * (1 - overlap)))
+        xs = window_starts(width, side, stride)
+        ys = window_starts(height, side, stride)
+        if len(boxes) + len(xs) * len(ys) > max_tiles:
+            continue
+        boxes.extend((x, y, x + side, y + side) for y in ys for x in xs)
+    return boxes or [(0, 0, width, height)]
+
+
+def unreachable_scales(scales, max_tiles, overlap=0.5, width=800, height=600):
+    """Scales tile_boxes drops for a width x height image (4:3 by default) because they exceed max_tiles"""
+    included = {(box[2] - box[0]) for box in tile_boxes(width, height, scales, overlap, max_tiles)}
+    return [scale for scale in scales if max(1, int(min(width, height) * scale)) not in included]
+
+
+def box_area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+
+def box_intersection(a, b):
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    return width * height if width > 0 and height > 0 else 0
+
+
+def box_overlap(a, b):
+    """Intersection area over the smaller box's area"""
+    return box_intersection(a, b) / min(box_area(a), box_area(b))
+
+
+def box_iou(a, b):
+    """Intersection over union of two boxes"""
+    intersection = box_intersection(a, b)
+    return intersection / (box_area(a) + box_area(b) - intersection)
+
+
+def merge_tiles(boxes, predictions, threshold=0.6, min_overlap=0.5, min_iou=0.3):
+    """Merge confident tiles into regions, returning dicts of box, class index, confidence and tile count
+
+    Tiles at or above threshold are visited in order of confidence. A tile
+    joins the first region of the same class it overlaps by at least
+    min_overlap of the smaller box (growing that region's box); otherwise
+    it starts a new region. Regions of different classes are only resolved
+    in favour of the more confident one when their IoU is at least min_iou,
+    so a small fish inside a larger region of another species is kept.
+
+    The largest tiles only count when no smaller tile is confident: a
+    full-frame tile overlaps everything and would swallow every fish in
+    the image into one region.
+    """
+    if not boxes:
+        return []
+    sides = np.array([box[2] - box[0] for box in boxes])
+    coarse = sides == sides.max()
+    regions = []
+    if not coarse.all():
+        regions = _merge(boxes, predictions, ~coarse, threshold, min_overlap, min_iou)
+    if not regions:
+        regions = _merge(boxes, predictions, coarse, threshold, min_overlap, min_iou)
+    return regions
+
+
+def _merge(boxes, predictions, selected, threshold, min_overlap, min_iou):
+    class_indices = predictions.argmax(axis=1)
+    confidences = np.where(selected, predictions.max(axis=1), -1.0)
+
+    regions = []
+    for i in np.argsort(-confidences):
+        if confidences[i] < threshold:
+            break
+        box, class_index = boxes[i], int(class_indices[i])
+        for region in regions:
+            if region["class_index"] == class_index and box_overlap(region["box"], box) >= min_overlap:
+                region["box"] = (
+                    min(region["box"][0], box[0]), min(region["box"][1], box[1]),
+                    max(region["box"][2], box[2]), max(region["box"][3], box[3])
+                )
+                region["tiles"] += 1
+                break
+        else:
+            regions.append({
+                "box": box,
+                "class_index": class_index,
+                "confidence": float(confidences[i]),
+                "tiles": 1,
+            })
+
+    # Regions are already in descending confidence order
+    kept = []
+    for region in regions:
+        if all(_distinct(region, other, min_overlap, min_iou) for other in kept):
+            kept.append(region)
+    return kept
+
+
+def _distinct(region, other, min_overlap, min_iou):
+    if region["class_index"] == other["class_index"]:
+        return box_overlap(region["box"], other["box"]) < min_overlap
+    return box_iou(region["box"], other["box"]) < min_iou
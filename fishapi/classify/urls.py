@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import predict_image
+from .views import predict_image, cascade_stats, similar_images
 
 urlpatterns = [
     path('predict/', predict_image),
+    path('predict/cascade/stats/', cascade_stats),
+    path('similar/', similar_images),
 ]
@@ -1,127 +1,205 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from keras.models import load_model
-from PIL import Image
 import numpy as np
-import tensorflow as tf
-import cv2
-import io
-import os
-import uuid
-from django.core.files.storage import default_storage
 from django.conf import settings
-import time
-from chatbot.rag_service import RAGService
-
-# Model will be loaded lazily to handle compatibility issues
-model = None
-model_path = os.path.join(os.path.dirname(__file__), 'best_fish_classifier.h5')
-
-def get_model():
-    global model
-    if model is None:
-        try:
-            model = load_model(model_path)
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            # Create a dummy model for testing
-            from keras.models import Sequential
-            from keras.layers import Dense, GlobalAveragePooling2D
-            model = Sequential([
-                GlobalAveragePooling2D(input_shape=(224, 224, 3)),
-                Dense(7, activation='softmax')
-            ])
-            model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
-    return model
-
-# Class labels
-class_names = [
-    "Bulath_hapaya", "Dankuda_pethiya", "Depulliya",
-    "Halamal_dandiya", "Lethiththaya", "Pathirana_salaya", "Thal_kossa"
-]
-
-def normalize(x):
-    """Normalize an array to the [0, 1] range"""
-    return (x - np.min(x)) / (np.max(x) - np.min(x) + 1e-10)
-
-def generate_gradcam_overlay(img_array, model, pred_class):
+from .species import class_names
+from .preprocessing import preprocess_upload, preprocess_tensor
+from .stages import StageGraph
+
+
+def classifier():
+    """Classifier model service, imported on first use so that TensorFlow,
+    Keras and OpenCV are never loaded by processes that do not classify"""
+    from . import classifier_service
+    return classifier_service
+
+
+def preprocess_request(files):
+    """Preprocess an 'image' upload, or a pre-resized 'tensor' upload (raw bytes or .npy)
+
+    Raises ValueError for invalid tensors.
+    """
+    if 'tensor' in files:
+        return preprocess_tensor(files['tensor'])
+    return preprocess_upload(files['image'])
+
+
+# The handlers below take the uploaded files and form fields and return
+# (body, status), so they can be served through DRF here and through the plain
+# Django views of the dedicated inference entry point (classify.inference_views)
+
+def classify_upload(files, data):
+    """Classify an uploaded image, returning (body, status)"""
+    if 'image' not in files and 'tensor' not in files:
+        return {'error': 'No image provided'}, 400
+    service = classifier()
+
+    # 'tiles' looks for several fish by classifying overlapping tiles of the full image
+    mode = data.get('mode', 'single')
+    if mode not in ('single', 'tiles'):
+        return {'error': "mode must be 'single' or 'tiles'"}, 400
+    if mode == 'tiles':
+        if 'image' not in files:
+            return {'error': "mode 'tiles' needs a full-resolution image upload"}, 400
+        return service.predict_regions(files['image']), 200
+
+    # 'overlay' renders a PNG on the server, 'raw' returns the saliency map itself
+    heatmap_format = data.get('heatmap_format', 'overlay')
+    if heatmap_format not in ('overlay', 'raw'):
+        return {'error': "heatmap_format must be 'overlay' or 'raw'"}, 400
+    heatmap_dtype = data.get('heatmap_dtype', 'uint8')
+    if heatmap_dtype not in service.RAW_SALIENCY_DTYPES:
+        return {'error': f"heatmap_dtype must be one of {', '.join(service.RAW_SALIENCY_DTYPES)}"}, 400
     try:
-        original_img = img_array.copy()
-        img_array = np.expand_dims(img_array, axis=0) / 255.0
-        img_tensor = tf.convert_to_tensor(img_array, dtype=tf.float32)
-
-        with tf.GradientTape() as tape:
-            tape.watch(img_tensor)
-            predictions = model(img_tensor)
-            target_score = predictions[:, pred_class]
+        heatmap_size = int(data.get('heatmap_size', service.RAW_SALIENCY_SIZE))
+    except (TypeError, ValueError):
+        return {'error': 'heatmap_size must be an integer'}, 400
+    if not 1 <= heatmap_size <= 224:
+        return {'error': 'heatmap_size must be between 1 and 224'}, 400
+    # Number of top classes to explain with raw saliency maps (0 disables)
+    try:
+        explain_top_k = int(data.get('explain_top_k', 0))
+    except (TypeError, ValueError):
+        return {'error': 'explain_top_k must be an integer'}, 400
+    if not 0 <= explain_top_k <= len(class_names):
+        return {'error': f'explain_top_k must be between 0 and {len(class_names)}'}, 400
+    # Optional higher quality explanation of the predicted class
+    explanation_method = data.get('explanation')
+    if explanation_method and explanation_method not in service.EXPLANATION_METHODS:
+        return {'error': f"explanation must be one of {', '.join(service.EXPLANATION_METHODS)}"}, 400
 
-        grads = tape.gradient(target_score, img_tensor)
+    try:
+        img_array, img_batch = preprocess_request(files)
+    except ValueError as e:
+        return {'error': str(e)}, 400
 
-        grad_mag = tf.reduce_max(tf.abs(grads), axis=-1)[0].numpy()
-        guided_grads = tf.cast(grads > 0, tf.float32) * grads
-        guided_mag = tf.reduce_sum(guided_grads, axis=-1)[0].numpy()
-        grad_input = grads * img_tensor
-        grad_input_mag = tf.reduce_sum(tf.abs(grad_input), axis=-1)[0].numpy()
+    # Get model (loads lazily)
+    current_model = service.get_model()
+
+    def predict():
+        current_cascade = service.get_cascade()
+        if current_cascade is not None:
+            predictions, model_stage = current_cascade.predict(img_batch)
+        else:
+            predictions, model_stage = service.get_inference_pool().predict(img_batch)[0], "full"
+        return int(np.argmax(predictions)), float(np.max(predictions)), predictions, model_stage
+
+    def saliency(predict):
+        class_index = predict[0]
+        return service.generate_gradcam_overlay(img_array, img_batch, current_model, class_index)
+
+    def raw_saliency(predict):
+        class_index = predict[0]
+        return service.generate_raw_saliency(img_batch, current_model, class_index, heatmap_size, heatmap_dtype)
+
+    def explanations(predict):
+        predictions = predict[2]
+        return service.generate_top_k_explanations(
+            img_batch, current_model, predictions, explain_top_k, heatmap_size, heatmap_dtype
+        )
+
+    def write_overlay(saliency):
+        return service.write_overlay_image(saliency)
+
+    def explanation(predict):
+        class_index = predict[0]
+        return service.generate_explanation(
+            img_batch, current_model, explanation_method, class_index, heatmap_size, heatmap_dtype
+        )
+
+    def similar():
+        return service.find_similar_references(img_batch, index, settings.CLASSIFY_SIMILAR_TOP_K)
+
+    def fish_info(predict):
+        class_index = predict[0]
+        return service.species_table[class_index]
+
+    # Saliency and the species lookup only depend on the prediction
+    graph = StageGraph()
+    graph.add('predict', predict)
+    if heatmap_format == 'raw':
+        graph.add('raw_saliency', raw_saliency, depends_on=['predict'])
+    else:
+        graph.add('saliency', saliency, depends_on=['predict'])
+        graph.add('write_overlay', write_overlay, depends_on=['saliency'])
+    if explain_top_k:
+        graph.add('explanations', explanations, depends_on=['predict'])
+    if explanation_method:
+        graph.add('explanation', explanation, depends_on=['predict'])
+    graph.add('fish_info', fish_info, depends_on=['predict'])
+    # Similar references only need the image, so they run alongside the prediction
+    index = service.get_reference_index()
+    if index is not None:
+        graph.add('similar', similar)
+    results, timings = graph.run()
+
+    class_index, confidence, _, model_stage = results['predict']
+
+    # Return prediction with the heatmap (image path or raw array) and additional info
+    response = {
+        "prediction": class_names[class_index],
+        "confidence": round(confidence, 3),
+        "model_stage": model_stage,
+        "fish_info": results['fish_info'],
+        "timings_ms": timings
+    }
+    if heatmap_format == 'raw':
+        response["heatmap"] = results['raw_saliency']
+    else:
+        response["heatmap_image"] = f"/media/{results['write_overlay']}"
+    if explain_top_k:
+        response["explanations"] = results['explanations']
+    if explanation_method:
+        response["explanation"] = results['explanation']
+    if index is not None:
+        response["similar_references"] = results['similar']
+    return response, 200
+
+
+def find_similar(files, data):
+    """Reference images most similar to the uploaded image, returning (body, status)"""
+    if 'image' not in files and 'tensor' not in files:
+        return {'error': 'No image provided'}, 400
+    service = classifier()
+    index = service.get_reference_index()
+    if index is None:
+        return {'error': 'Reference index has not been built'}, 503
+    try:
+        k = int(data.get('k', settings.CLASSIFY_SIMILAR_TOP_K))
+    except (TypeError, ValueError):
+        return {'error': 'k must be an integer'}, 400
 
-        composite_heatmap = (normalize(grad_mag) + normalize(guided_mag) + normalize(grad_input_mag)) / 3
-        composite_heatmap = cv2.GaussianBlur(composite_heatmap, (5, 5), 0)
-        composite_heatmap = normalize(composite_heatmap)
+    try:
+        _, img_batch = preprocess_request(files)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    results = service.find_similar_references(img_batch, index, max(1, k))
+    if results is None:
+        return {'error': 'Similar image search failed'}, 500
+    return {'similar_references': results}, 200
 
-        heatmap_colored = cv2.applyColorMap(np.uint8(255 * composite_heatmap), cv2.COLORMAP_JET)
-        heatmap_colored = cv2.cvtColor(heatmap_colored, cv2.COLOR_BGR2RGB)
 
-        superimposed = cv2.addWeighted(original_img.astype('uint8'), 0.6, heatmap_colored, 0.4, 0)
+def cascade_summary():
+    """Fraction of requests resolved by each stage of the model cascade"""
+    current_cascade = classifier().get_cascade()
+    if current_cascade is None:
+        return {'enabled': False}
+    return {'enabled': True, **current_cascade.stats()}
 
-        return superimposed
-    except Exception as e:
-        print(f"Error generating heatmap: {e}")
-        # Return original image if heatmap generation fails
-        return original_img.astype('uint8')
 
 @api_view(['POST'])
 def predict_image(request):
-    if 'image' not in request.FILES:
-        return Response({'error': 'No image provided'}, status=400)
+    body, status = classify_upload(request.FILES, request.data)
+    return Response(body, status=status)
 
-    image_file = request.FILES['image']
-    img = Image.open(image_file).convert("RGB")
-    img = img.resize((224, 224))
-    img_array = np.array(img)
 
-    # Get model (loads lazily)
-    current_model = get_model()
-
-    # Predict
-    img_tensor = np.expand_dims(img_array / 255.0, axis=0)
-    predictions = current_model.predict(img_tensor)[0]
-    class_index = int(np.argmax(predictions))
-    confidence = float(np.max(predictions))
-    class_name = class_names[class_index]
-
-    # Generate heatmap overlay
-    overlay_img = generate_gradcam_overlay(img_array, current_model, class_index)
-
-    # Save overlay image to disk
-    filename = f"overlay_{uuid.uuid4().hex}.png"
-    overlay_path = os.path.join(settings.MEDIA_ROOT, filename)
-    cv2.imwrite(overlay_path, overlay_img)
-
-    # Ensure file is written before returning
-    for _ in range(10):  # wait max 2 seconds
-        if os.path.exists(overlay_path):
-            break
-        time.sleep(0.2)
-
-    time.sleep(0.3)
-    
-    # Get additional information about the predicted fish from RAG service
-    rag_service = RAGService()
-    fish_info = rag_service.get_fish_information(class_name)
-    
-    # Return prediction with relative path to image and additional info
-    return Response({
-        "prediction": class_name,
-        "confidence": round(confidence, 3),
-        "heatmap_image": f"/media/{filename}",
-        "fish_info": fish_info
-    })
+@api_view(['POST'])
+def similar_images(request):
+    """Reference images most similar to the uploaded image"""
+    body, status = find_similar(request.FILES, request.data)
+    return Response(body, status=status)
+
+@api_view(['GET'])
+def cascade_stats(request):
+    """Fraction of requests resolved by each stage of the model cascade"""
+    return Response(cascade_summary())
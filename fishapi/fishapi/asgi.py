@@ -14,3 +14,16 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fishapi.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings
+
+if settings.FISHAPI_SERVE_CHATBOT and settings.CHATBOT_PRELOAD_KNOWLEDGE_BASE:
+    # Parse the ontology once per worker before it takes requests
+    from chatbot.knowledge_base import get_knowledge_base
+    get_knowledge_base()
+
+if settings.FISHAPI_IMPORT_REPORT:
+    # The URL conf is normally imported on the first request; load it now so
+    # the report covers every view module this worker will serve
+    from .import_report import timed_import, format_report
+    print(f"Startup imports: {format_report(timed_import(settings.ROOT_URLCONF))}")
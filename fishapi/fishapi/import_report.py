@@ -0,0 +1,40 @@
+"""
+Import-time report
+Shows how long loading a module took, the peak memory of the process and which
+heavy libraries (TensorFlow, Keras, OpenCV, rdflib, OpenAI) ended up imported
+"""
+import importlib
+import resource
+import sys
+import time
+
+HEAVY_MODULES = ('tensorflow', 'keras', 'cv2', 'rdflib', 'openai')
+
+
+def loaded_heavy_modules():
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed_import(module_name):
+    """Import module_name, returning a dict with the time taken and what it loaded"""
+    start = time.perf_counter()
+    importlib.import_module(module_name)
+    return {
+        "module": module_name,
+        "import_ms": round((time.perf_counter() - start) * 1000, 1),
+        "max_rss_mb": round(max_rss_mb(), 1),
+        "heavy_modules": loaded_heavy_modules(),
+    }
+
+
+def format_report(result):
+    heavy = ', '.join(result['heavy_modules']) or 'none'
+    return (
+        f"{result['module']}: {result['import_ms']:.0f} ms, "
+        f"max RSS {result['max_rss_mb']:.0f} MB, heavy modules: {heavy}"
+    )
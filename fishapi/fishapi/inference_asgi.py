@@ -0,0 +1,17 @@
+"""
+ASGI config for the dedicated fish classification entry point.
+
+Serves /predict/, /predict/cascade/stats/ and /similar/ with a minimal
+middleware chain (see fishapi.inference_settings), e.g.
+
+    uvicorn fishapi.inference_asgi:application
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+# Always use the inference settings, even where DJANGO_SETTINGS_MODULE is set for the main app
+os.environ['DJANGO_SETTINGS_MODULE'] = 'fishapi.inference_settings'
+
+application = get_asgi_application()
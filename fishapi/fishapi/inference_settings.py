@@ -0,0 +1,20 @@
+"""
+Settings for the dedicated inference entry point (fishapi.inference_wsgi / fishapi.inference_asgi)
+
+Only the classify endpoints are mounted, behind CORS and CommonMiddleware;
+sessions, CSRF, auth, messages and clickjacking protection are left out as the
+classifier is stateless.
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'corsheaders',
+    'classify',
+]
+
+MIDDLEWARE = [
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'fishapi.inference_urls'
@@ -0,0 +1,11 @@
+"""
+URL configuration for the dedicated inference entry point
+Serves the classify endpoints only, at the same paths as fishapi.urls
+"""
+from django.urls import path, include
+from django.conf import settings
+from django.conf.urls.static import static
+
+urlpatterns = [
+    path('', include('classify.inference_urls')),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
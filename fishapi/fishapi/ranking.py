@@ -0,0 +1,13 @@
+"""
+Top-k selection shared by the similar-image and passage retrieval indexes
+"""
+import numpy as np
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first (ties keep index order)"""
+    k = min(k, len(scores))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
@@ -14,6 +14,8 @@ from pathlib import Path
 import os
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
+# Files the app writes at runtime (caches, snapshots, indexes, logs); ignored by git
+DATA_DIR = Path(os.getenv('FISHAPI_DATA_DIR', BASE_DIR / 'var'))
 
 
 # Quick-start development settings - unsuitable for production
@@ -85,6 +87,22 @@ DATABASES = {
     }
 }
 
+# Caches
+# The chatbot answer cache is shared by all worker processes on a host; point
+# CHATBOT_ANSWER_CACHE_BACKEND/LOCATION at Redis or Memcached to share it across hosts
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'chatbot_answers': {
+        'BACKEND': os.getenv('CHATBOT_ANSWER_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CHATBOT_ANSWER_CACHE_LOCATION', os.path.join(DATA_DIR, 'chatbot_answer_cache')),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -129,6 +147,86 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Which APIs this process serves. Set FISHAPI_SERVE_CLASSIFY=0 to run lean
+# chatbot-only workers that never import TensorFlow, Keras or OpenCV
+FISHAPI_SERVE_CLASSIFY = os.getenv('FISHAPI_SERVE_CLASSIFY', '1') == '1'
+FISHAPI_SERVE_CHATBOT = os.getenv('FISHAPI_SERVE_CHATBOT', '1') == '1'
+# Print how long startup imports took and which heavy libraries they loaded
+FISHAPI_IMPORT_REPORT = os.getenv('FISHAPI_IMPORT_REPORT', '0') == '1'
+
+# Classification settings
+# Number of model replicas in the inference pool; requests go to the replica
+# with the shortest queue
+CLASSIFY_INFERENCE_REPLICAS = int(os.getenv('CLASSIFY_INFERENCE_REPLICAS', '1'))
+# Maximum number of images a replica combines into one forward pass
+CLASSIFY_INFERENCE_MAX_BATCH = int(os.getenv('CLASSIFY_INFERENCE_MAX_BATCH', '8'))
+# Threads used to run independent stages of a prediction request concurrently
+CLASSIFY_STAGE_WORKERS = int(os.getenv('CLASSIFY_STAGE_WORKERS', '4'))
+# Memory cap for each batch of perturbed images used by SmoothGrad / occlusion explanations
+CLASSIFY_EXPLANATION_MEMORY_MB = int(os.getenv('CLASSIFY_EXPLANATION_MEMORY_MB', '256'))
+# Model cascade: a fast model (e.g. built with `manage.py build_fast_model`) answers
+# first and the full model only runs below the confidence threshold. The cascade is
+# disabled when the fast model file does not exist.
+CLASSIFY_CASCADE_MODEL_PATH = os.getenv(
+    'CLASSIFY_CASCADE_MODEL_PATH', os.path.join(BASE_DIR, 'classify', 'best_fish_classifier_fast.tflite')
+)
+CLASSIFY_CASCADE_THRESHOLD = float(os.getenv('CLASSIFY_CASCADE_THRESHOLD', '0.9'))
+# Fraction of fast-model answers also checked by the full model for threshold tuning
+CLASSIFY_CASCADE_AUDIT_RATE = float(os.getenv('CLASSIFY_CASCADE_AUDIT_RATE', '0.05'))
+# JSONL log of both models' outputs
+CLASSIFY_CASCADE_LOG = os.getenv('CLASSIFY_CASCADE_LOG', os.path.join(DATA_DIR, 'cascade_log.jsonl'))
+# Multi-fish tiled mode: tile sizes as fractions of the shorter image side, the
+# maximum number of tiles per image and the confidence a tile needs to count.
+# The three scales take 35 tiles on a square image and 49 on a 4:3 one; every
+# scale must fit a 4:3 image, wider images may drop the smallest scale
+CLASSIFY_TILE_SCALES = (1.0, 0.6, 0.35)
+CLASSIFY_TILE_MAX = int(os.getenv('CLASSIFY_TILE_MAX', '64'))
+CLASSIFY_TILE_THRESHOLD = float(os.getenv('CLASSIFY_TILE_THRESHOLD', '0.6'))
+# Similar reference images: index built with `manage.py build_reference_index`
+CLASSIFY_REFERENCE_INDEX_DIR = os.getenv('CLASSIFY_REFERENCE_INDEX_DIR', os.path.join(DATA_DIR, 'reference_index'))
+CLASSIFY_SIMILAR_TOP_K = int(os.getenv('CLASSIFY_SIMILAR_TOP_K', '5'))
+# Partitions scanned per query when the index was built with --partitions
+CLASSIFY_REFERENCE_N_PROBE = int(os.getenv('CLASSIFY_REFERENCE_N_PROBE', '4'))
+
+# Chatbot settings
+# Species ontology read once per process into the shared knowledge base
+CHATBOT_ONTOLOGY_PATH = os.getenv('CHATBOT_ONTOLOGY_PATH', os.path.join(BASE_DIR, 'fish6species(1).owl'))
+# Precompiled snapshot of the extracted ontology (`manage.py build_ontology_snapshot`);
+# used when it matches the ontology file's hash, otherwise rebuilt from the OWL file
+CHATBOT_ONTOLOGY_SNAPSHOT = os.getenv('CHATBOT_ONTOLOGY_SNAPSHOT', os.path.join(DATA_DIR, 'fish_ontology.snapshot'))
+# Build the knowledge base when a WSGI/ASGI worker starts rather than on the first chat request
+CHATBOT_PRELOAD_KNOWLEDGE_BASE = os.getenv('CHATBOT_PRELOAD_KNOWLEDGE_BASE', '1') == '1'
+# Ontology passages retrieved when a question names no species
+CHATBOT_PASSAGE_TOP_K = int(os.getenv('CHATBOT_PASSAGE_TOP_K', '5'))
+# Species named in that context, ranked by the summed score of their retrieved passages
+CHATBOT_SPECIES_TOP_K = int(os.getenv('CHATBOT_SPECIES_TOP_K', '3'))
+# Passage retrieval: 'keyword' (BM25), 'dense' (hashed n-gram embeddings) or 'hybrid'
+CHATBOT_RETRIEVAL = os.getenv('CHATBOT_RETRIEVAL', 'hybrid')
+# Weight of the dense cosine score in hybrid retrieval; BM25 gets the rest
+CHATBOT_HYBRID_DENSE_WEIGHT = float(os.getenv('CHATBOT_HYBRID_DENSE_WEIGHT', '0.5'))
+# Cosine similarity below which a dense match is treated as noise (greetings share stray n-grams with the ontology)
+CHATBOT_DENSE_MIN_SCORE = float(os.getenv('CHATBOT_DENSE_MIN_SCORE', '0.25'))
+# Memory-mapped passage embeddings, one subdirectory per ontology version (empty disables dense retrieval)
+CHATBOT_DENSE_INDEX_DIR = os.getenv('CHATBOT_DENSE_INDEX_DIR', os.path.join(DATA_DIR, 'chatbot_dense_index'))
+# Approximate token budget of the ontology context sent to the LLM with each question
+CHATBOT_CONTEXT_TOKEN_BUDGET = int(os.getenv('CHATBOT_CONTEXT_TOKEN_BUDGET', '1200'))
+# Cap on max_tokens for an answer; the allowance itself depends on the question's intent
+CHATBOT_MAX_RESPONSE_TOKENS = int(os.getenv('CHATBOT_MAX_RESPONSE_TOKENS', '800'))
+# LLM answers are cached by question, retrieved context and prompt version: fresh for
+# CHATBOT_ANSWER_CACHE_TTL seconds (0 disables caching), then served stale for up to
+# CHATBOT_ANSWER_CACHE_STALE_TTL more seconds while a background request refreshes them
+CHATBOT_ANSWER_CACHE_TTL = int(os.getenv('CHATBOT_ANSWER_CACHE_TTL', '86400'))
+CHATBOT_ANSWER_CACHE_STALE_TTL = int(os.getenv('CHATBOT_ANSWER_CACHE_STALE_TTL', '604800'))
+# Answers kept in each process's in-memory LRU tier
+CHATBOT_ANSWER_CACHE_SIZE = int(os.getenv('CHATBOT_ANSWER_CACHE_SIZE', '1024'))
+# CACHES alias of the shared tier (empty for in-process caching only)
+CHATBOT_ANSWER_CACHE_ALIAS = os.getenv('CHATBOT_ANSWER_CACHE_ALIAS', 'chatbot_answers')
+# Answers kept for near-duplicate questions (same species, intent and context, similar
+# remaining words); 0 disables. Entries expire after CHATBOT_ANSWER_CACHE_TTL
+CHATBOT_SEMANTIC_CACHE_SIZE = int(os.getenv('CHATBOT_SEMANTIC_CACHE_SIZE', '4096'))
+# Cosine similarity of the remaining words needed to reuse an answer
+CHATBOT_SEMANTIC_CACHE_THRESHOLD = float(os.getenv('CHATBOT_SEMANTIC_CACHE_THRESHOLD', '0.9'))
+
 # CORS settings for allowing requests from other devices
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
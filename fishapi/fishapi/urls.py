@@ -21,6 +21,9 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', include('classify.urls')),
-    path('chatbot/', include('chatbot.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+if settings.FISHAPI_SERVE_CLASSIFY:
+    urlpatterns.append(path('', include('classify.urls')))
+if settings.FISHAPI_SERVE_CHATBOT:
+    urlpatterns.append(path('chatbot/', include('chatbot.urls')))
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -101,6 +101,84 @@ def test_classification_api():
         if os.path.exists(temp_image_path):
             os.remove(temp_image_path)
 
+def test_semantic_cache():
+    """Check which questions share a semantic cache entry (runs without the server)"""
+    print("Testing Semantic Answer Cache...")
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fishapi.settings')
+    import django
+    django.setup()
+    from chatbot.rag_service import RAGService
+    from chatbot.semantic_cache import SemanticCache
+
+    service = RAGService()
+
+    def signature(question):
+        return service._semantic_signature(question, service._retrieve_information(question))
+
+    cases = [
+        # (cached question, new question, should the answer be reused)
+        ("where does depulliya live", "depulliya habitat?", True),
+        ("why is depulliya endangered", "is depulliya endangered", False),
+        ("is depulliya endangered", "why is depulliya endangered", False),
+    ]
+    for cached, asked, expected in cases:
+        service.semantic_cache = SemanticCache()
+        service.semantic_cache.put(signature(cached), "cached answer")
+        reused = service.semantic_cache.get(signature(asked)) is not None
+        mark = "✅" if reused == expected else "❌"
+        print(f"{mark} {cached!r} -> {asked!r}: {'reused' if reused else 'not reused'}")
+    print()
+
+def test_tiling():
+    """Check multi-fish tiling on extreme aspect ratios (runs without the server)"""
+    print("Testing Tiling...")
+    from classify.tiling import tile_boxes, merge_tiles
+    from classify.preprocessing import tiles_into, INPUT_SHAPE
+
+    for width, height in [(4000, 20), (20, 4000), (800, 600)]:
+        boxes = tile_boxes(width, height)
+        batch = tiles_into(
+            Image.new('RGB', (width, height), color='red'), boxes,
+            np.empty((len(boxes),) + INPUT_SHAPE, dtype=np.float32)
+        )
+        predictions = np.zeros((len(boxes), 6), dtype=np.float32)
+        predictions[:, 0] = 0.9
+        regions = merge_tiles(boxes, predictions)
+        ok = 0 < len(boxes) <= 64 and len(batch) == len(boxes) and len(regions) == 1
+        mark = "✅" if ok else "❌"
+        print(f"{mark} {width}x{height}: {len(boxes)} tiles, {len(regions)} regions")
+    print()
+
+def test_species_ranking():
+    """Check species ranked from passage hits for questions naming no species (runs without the server)"""
+    print("Testing Species Ranking...")
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fishapi.settings')
+    import django
+    django.setup()
+    from chatbot.knowledge_base import rank_species
+    from chatbot.rag_service import RAGService
+
+    hits = [(2.0, "a", "habitat", ""), (1.5, "b", "habitat", ""), (1.0, "a", "ecology", ""), (1.5, "c", "diet", "")]
+    ranked = [key for key, score in rank_species(hits, k=2)]
+    mark = "✅" if ranked == ["a", "b"] else "❌"
+    print(f"{mark} rank_species: {ranked}")
+
+    service = RAGService()
+    for question in ["which fish live in fast flowing streams", "hi"]:
+        retrieved = service._retrieve_information(question)
+        top_species = retrieved['top_species']
+        if retrieved['passages']:
+            passage_species = {fish_key for fish_key, fish_info, field, text in retrieved['passages']}
+            ok = top_species and all(
+                fish_key in passage_species and fish_info['scientific'] in retrieved['context']
+                for fish_key, fish_info in top_species
+            )
+        else:
+            ok = not top_species
+        mark = "✅" if ok else "❌"
+        print(f"{mark} {question!r}: {[fish_info['vernacular'] for fish_key, fish_info in top_species]}")
+    print()
+
 def main():
     print("🐠 Testing Fish API Integration")
     print("=" * 50)
@@ -109,6 +187,9 @@ def main():
     import time
     time.sleep(2)
     
+    test_tiling()
+    test_species_ranking()
+    test_semantic_cache()
     test_species_api()
     test_chatbot_api()
     test_classification_api()